@@ -1,15 +1,131 @@
 import os
+import time
+import queue
+import threading
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-from concurrent.futures import ThreadPoolExecutor
-import threading
 import batchprocessor  # Import the updated batch processor module
+import rowindex
+
+# How often the UI drains job events, and how many it handles per poll,
+# so even a 10k-file batch never holds the Tk thread for long.
+POLL_INTERVAL_MS = 100
+MAX_EVENTS_PER_POLL = 2000
+
+# Rows shown per page of the preview window
+PREVIEW_ROWS = 100
+
+
+class PreviewWindow:
+    """Shows a page of a file's rows at a time, read on a worker thread"""
+
+    def __init__(self, root, path):
+        self.path = path
+        self.start = 0
+        self.pages = queue.Queue()
+
+        self.window = tk.Toplevel(root)
+        self.window.title(f"Preview - {os.path.basename(path)}")
+        self.window.geometry("800x500")
+
+        controls = ttk.Frame(self.window)
+        controls.pack(fill="x", padx=5, pady=5)
+        self.prev_button = ttk.Button(controls, text="< Prev", command=lambda: self.load(self.start - PREVIEW_ROWS))
+        self.prev_button.pack(side="left")
+        self.next_button = ttk.Button(controls, text="Next >", command=lambda: self.load(self.start + PREVIEW_ROWS))
+        self.next_button.pack(side="left", padx=5)
+        ttk.Label(controls, text="Go to row:").pack(side="left", padx=(15, 0))
+        self.row_entry = ttk.Entry(controls, width=12)
+        self.row_entry.pack(side="left", padx=5)
+        self.row_entry.bind("<Return>", lambda event: self.go_to_row())
+        self.go_button = ttk.Button(controls, text="Go", command=self.go_to_row)
+        self.go_button.pack(side="left")
+        self.status_label = ttk.Label(controls, text="")
+        self.status_label.pack(side="left", padx=15)
+
+        table = ttk.Frame(self.window)
+        table.pack(fill="both", expand=True, padx=5, pady=5)
+        self.tree = ttk.Treeview(table, show="headings")
+        y_scroll = ttk.Scrollbar(table, orient="vertical", command=self.tree.yview)
+        x_scroll = ttk.Scrollbar(table, orient="horizontal", command=self.tree.xview)
+        self.tree.configure(yscrollcommand=y_scroll.set, xscrollcommand=x_scroll.set)
+        y_scroll.pack(side="right", fill="y")
+        x_scroll.pack(side="bottom", fill="x")
+        self.tree.pack(fill="both", expand=True)
+
+        self.load(0)
+
+    def go_to_row(self):
+        if str(self.go_button["state"]) == "disabled":
+            return
+        try:
+            row = int(self.row_entry.get())
+        except ValueError:
+            messagebox.showerror("Error", "Please enter a row number.", parent=self.window)
+            return
+        self.load(row)
+
+    def load(self, start):
+        """Read the page starting at row start in the background."""
+        start = max(start, 0)
+        self.status_label.config(text="Loading...")
+        for button in (self.prev_button, self.next_button, self.go_button):
+            button.config(state="disabled")
+        threading.Thread(target=self.read_page, args=(start,), daemon=True).start()
+        self.window.after(POLL_INTERVAL_MS, self.poll_page)
+
+    def read_page(self, start):
+        try:
+            rows = list(batchprocessor.read_rows(self.path, start, start + PREVIEW_ROWS))
+            # The total is only known for free once the CSV has been indexed
+            index = rowindex.CsvRowIndex.load(self.path)
+            self.pages.put((start, rows, None if index is None else index.rows))
+        except Exception as e:
+            self.pages.put(e)
+
+    def poll_page(self):
+        if not self.window.winfo_exists():
+            return
+        try:
+            page = self.pages.get_nowait()
+        except queue.Empty:
+            self.window.after(POLL_INTERVAL_MS, self.poll_page)
+            return
+
+        self.go_button.config(state="normal")
+        if isinstance(page, Exception):
+            self.status_label.config(text="")
+            self.prev_button.config(state="normal" if self.start else "disabled")
+            messagebox.showerror("Error", f"Could not read the file:\n{page}", parent=self.window)
+            return
+
+        start, rows, total = page
+        self.start = start
+        self.show_rows(start, rows)
+        shown = f"Rows {start}-{start + len(rows) - 1}" if rows else f"No rows from {start}"
+        self.status_label.config(text=shown if total is None else f"{shown} of {total}")
+        self.prev_button.config(state="normal" if start else "disabled")
+        self.next_button.config(state="normal" if len(rows) == PREVIEW_ROWS else "disabled")
+
+    def show_rows(self, start, rows):
+        width = max(map(len, rows), default=0)
+        self.tree.delete(*self.tree.get_children())
+        self.tree["columns"] = ["row"] + [f"cell{number}" for number in range(width)]
+        self.tree.heading("row", text="#")
+        self.tree.column("row", width=60, stretch=False)
+        for number in range(width):
+            self.tree.heading(f"cell{number}", text=str(number + 1))
+            self.tree.column(f"cell{number}", width=120, stretch=False)
+        for number, row in enumerate(rows, start):
+            self.tree.insert("", "end", values=[number] + ["" if cell is None else str(cell) for cell in row])
+
 
 class FileConverterApp:
     def __init__(self, root):
         self.root = root
         self.root.title("File Converter")
-        self.root.geometry("600x400")
+        self.root.geometry("600x450")
+        self.job = None
 
         # File Selection
         self.input_label = ttk.Label(root, text="Select Input File:")
@@ -26,17 +142,25 @@ class FileConverterApp:
         self.format_label.pack(pady=5)
 
         self.format_var = tk.StringVar(value="JSON")
-        self.format_menu = ttk.Combobox(root, textvariable=self.format_var, values=["CSV", "JSON", "XML"])
+        self.format_menu = ttk.Combobox(root, textvariable=self.format_var, values=["CSV", "JSON", "XML", "NDJSON"])
         self.format_menu.pack()
 
         # Convert Button
         self.convert_button = ttk.Button(root, text="Convert", command=self.start_conversion)
         self.convert_button.pack(pady=10)
 
+        # Preview Button
+        self.preview_button = ttk.Button(root, text="Preview Rows", command=self.preview_file)
+        self.preview_button.pack(pady=5)
+
         # Batch Processing Button
         self.batch_button = ttk.Button(root, text="Batch Convert (Folder)", command=self.batch_convert)
         self.batch_button.pack(pady=5)
 
+        # Cancel Button
+        self.cancel_button = ttk.Button(root, text="Cancel", command=self.cancel_job, state="disabled")
+        self.cancel_button.pack(pady=5)
+
         # Progress Bar
         self.progress_label = ttk.Label(root, text="")
         self.progress_label.pack(pady=5)
@@ -44,61 +168,136 @@ class FileConverterApp:
         self.progress = ttk.Progressbar(root, orient="horizontal", length=300, mode="determinate")
         self.progress.pack()
 
+        self.rate_label = ttk.Label(root, text="")
+        self.rate_label.pack(pady=5)
+
     def select_input_file(self):
         file_path = filedialog.askopenfilename()
         self.input_entry.delete(0, tk.END)
         self.input_entry.insert(0, file_path)
 
     def start_conversion(self):
-        """Start file conversion in a separate thread."""
-        threading.Thread(target=self.convert_file, daemon=True).start()
+        """Convert the selected file in the background."""
+        input_path = self.input_entry.get()
 
-    def convert_file(self):
-        """Convert a single file format."""
+        if not input_path:
+            messagebox.showerror("Error", "Please select an input file.")
+            return
+
+        self.start_job(input_path, "Conversion in Progress...")
+
+    def preview_file(self):
+        """Show the selected file's rows page by page, without converting it."""
         input_path = self.input_entry.get()
-        output_format = self.format_var.get()
 
         if not input_path:
             messagebox.showerror("Error", "Please select an input file.")
             return
 
-        try:
-            output_path = batchprocessor.process_conversion(input_path, output_format)
-            messagebox.showinfo("Success", f"File converted successfully: {output_path}")
-        except Exception as e:
-            messagebox.showerror("Error", f"Conversion failed: {str(e)}")
+        PreviewWindow(self.root, input_path)
 
     def batch_convert(self):
-        """Start batch conversion in a separate thread."""
-        threading.Thread(target=self.batch_process, daemon=True).start()
-
-    def batch_process(self):
-        """Process multiple files in batch with progress bar."""
+        """Convert every file in a folder in the background."""
         folder_path = filedialog.askdirectory()
-        output_format = self.format_var.get()
 
         if not folder_path:
             messagebox.showerror("Error", "Please select a folder.")
             return
 
-        files = [os.path.join(folder_path, f) for f in os.listdir(folder_path) if f.endswith(('.csv', '.json', '.xml'))]
+        self.start_job(folder_path, "Batch Conversion in Progress...")
 
-        if not files:
-            messagebox.showerror("Error", "No compatible files found in the folder.")
-            return
+    def start_job(self, path, message):
+        """Run a ConversionJob and follow it from the Tk thread."""
+        self.job = batchprocessor.ConversionJob(path, self.format_var.get())
+        self.total = 0
+        self.completed = 0
+        self.bytes_in = 0
+        self.errors = []
+        self.started = time.perf_counter()
 
-        self.progress_label.config(text="Batch Conversion in Progress...")
+        self.progress_label.config(text=message)
+        self.rate_label.config(text="")
         self.progress["value"] = 0
-        self.progress["maximum"] = len(files)
+        self.progress["maximum"] = 1
+        self.set_running(True)
+
+        self.job.start()
+        self.root.after(POLL_INTERVAL_MS, self.poll_job)
+
+    def cancel_job(self):
+        """Stop the running job from starting any more files."""
+        if self.job is not None:
+            self.job.cancel()
+            self.cancel_button.config(state="disabled")
+            self.progress_label.config(text="Cancelling...")
+
+    def set_running(self, running):
+        state = "disabled" if running else "normal"
+        self.convert_button.config(state=state)
+        self.batch_button.config(state=state)
+        self.cancel_button.config(state="normal" if running else "disabled")
+
+    def poll_job(self):
+        """Apply queued job events to the widgets, then poll again unless the job ended."""
+        finished = None
+        for _ in range(MAX_EVENTS_PER_POLL):
+            try:
+                kind, value = self.job.events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "start":
+                self.total = value
+                self.progress["maximum"] = max(value, 1)
+            elif kind == "result":
+                self.completed += 1
+                if value.error is not None:
+                    self.errors.append(value)
+                elif not value.skipped:
+                    self.bytes_in += value.bytes_in
+            else:
+                finished = (kind, value)
+                break
+
+        self.progress["value"] = self.completed
+        elapsed = time.perf_counter() - self.started
+        if elapsed > 0:
+            self.rate_label.config(text=f"{self.completed}/{self.total} files  |  "
+                                        f"{self.completed / elapsed:.1f} files/s  |  "
+                                        f"{self.bytes_in / elapsed / 1e6:.1f} MB/s")
+
+        if finished is None:
+            self.root.after(POLL_INTERVAL_MS, self.poll_job)
+        else:
+            self.finish_job(*finished)
+
+    def finish_job(self, kind, value):
+        """Report the outcome of the job that just ended."""
+        cancelled = self.job.cancelled
+        self.job = None
+        self.set_running(False)
+
+        if kind == "error":
+            self.progress_label.config(text="Conversion Failed")
+            messagebox.showerror("Error", f"Conversion failed: {value}")
+            return
 
-        with ThreadPoolExecutor() as executor:
-            for file in files:
-                executor.submit(batchprocessor.process_conversion, file, output_format)
-                self.progress["value"] += 1
-                self.root.update_idletasks()
+        summary = value.summary()
+        details = (f"{summary['converted']} converted, {summary['skipped']} skipped, "
+                   f"{summary['failed']} failed")
+        if cancelled:
+            details += f", {summary['cancelled']} cancelled"
+        self.progress_label.config(text=f"{'Cancelled' if cancelled else 'Completed'}: {details}")
 
-        self.progress_label.config(text="Batch Conversion Completed!")
-        messagebox.showinfo("Success", "Batch conversion completed.")
+        if self.errors:
+            shown = "\n".join(f"{record.input_file}: {record.error}" for record in self.errors[:10])
+            if len(self.errors) > 10:
+                shown += f"\n... and {len(self.errors) - 10} more"
+            messagebox.showerror("Error", f"{details}\n\n{shown}")
+        elif not cancelled:
+            if summary["files"] == 1 and value:
+                messagebox.showinfo("Success", f"File converted successfully: {value[0]}")
+            else:
+                messagebox.showinfo("Success", f"Batch conversion completed: {details}")
 
 if __name__ == "__main__":
     root = tk.Tk()
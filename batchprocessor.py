@@ -1,151 +1,1478 @@
+import io
 import os
+import sys
+import re
 import json
 import csv
+import time
+import queue
+import shutil
+import fnmatch
+import itertools
+import bisect
+import threading
 import xml.etree.ElementTree as ET
-from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager, nullcontext
+from columnar import ColumnarTable
+from rowindex import csv_row_index
+
+# concurrent.futures, hashlib, mmap, tempfile and the compression modules are
+# imported where they are used: together they cost more than the conversion of
+# a small file, and the command line should start instantly for short jobs.
+
+# Bump whenever a change alters conversion output, so manifest entries written
+# by older versions are treated as stale and their inputs are reconverted.
+CONVERTER_VERSION = "1.2"
+
+# Output files are written through a large buffer so streamed rows reach the
+# disk in big sequential writes instead of one small write per element.
+_BUFFER_SIZE = 1 << 20
+
+# Large CSV files are split into byte ranges of about this size for parallel conversion.
+_SPLIT_SIZE = 64 << 20
+
+# Input is pulled in chunks of this many characters by the incremental readers.
+_CHUNK_SIZE = 1 << 20
+
+_XML_DECLARATION = "<?xml version='1.0' encoding='utf-8'?>\n"
+
+# A last suffix naming a compression wraps the file in that codec: data.csv.gz
+# is gzip-compressed CSV. "none" asks for uncompressed output.
+_COMPRESSIONS = ("gz", "bz2", "xz")
+
+# Lowest and highest compression level each codec accepts
+_COMPRESSION_LEVELS = {"gz": (0, 9), "bz2": (1, 9), "xz": (0, 9)}
+
 
 # ------------------------------
-# File Conversion Functions
+# Instrumentation
+# ------------------------------
+
+class ConversionMetrics:
+    """Counters and exclusive per-stage timings collected while one file is converted"""
+
+    def __init__(self):
+        self.stages = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.rows = 0
+        self._stack = []
+
+    def start(self, stage):
+        self._stack.append([stage, time.perf_counter(), 0.0])
+
+    def stop(self):
+        stage, started, nested = self._stack.pop()
+        elapsed = time.perf_counter() - started
+        self.stages[stage] = self.stages.get(stage, 0.0) + elapsed - nested
+        if self._stack:
+            self._stack[-1][2] += elapsed
+
+    @contextmanager
+    def stage(self, stage):
+        self.start(stage)
+        try:
+            yield
+        finally:
+            self.stop()
+
+
+def _stage(metrics, stage):
+    """metrics.stage(stage), or a no-op when conversion is not instrumented"""
+    return nullcontext() if metrics is None else metrics.stage(stage)
+
+
+def _metered_rows(rows, metrics, stage="parse", count=None):
+    """Charge the time spent producing each row to stage, counting parsed rows"""
+    if metrics is None:
+        return rows
+    return _iter_metered_rows(iter(rows), metrics, stage, stage == "parse" if count is None else count)
+
+
+def _iter_metered_rows(rows, metrics, stage, count):
+    while True:
+        metrics.start(stage)
+        try:
+            row = next(rows)
+        except StopIteration:
+            return
+        finally:
+            metrics.stop()
+        if count:
+            metrics.rows += 1
+        yield row
+
+
+class _MeteredFileIO(io.FileIO):
+    """FileIO that charges its reads and writes, and their byte counts, to a ConversionMetrics"""
+
+    def __init__(self, file, mode, metrics, closefd=True):
+        super().__init__(file, mode, closefd=closefd)
+        self._metrics = metrics
+
+    def readinto(self, buffer):
+        self._metrics.start("read")
+        try:
+            count = super().readinto(buffer)
+        finally:
+            self._metrics.stop()
+        self._metrics.bytes_in += count or 0
+        return count
+
+    def readall(self):
+        self._metrics.start("read")
+        try:
+            data = super().readall()
+        finally:
+            self._metrics.stop()
+        self._metrics.bytes_in += len(data)
+        return data
+
+    def write(self, data):
+        self._metrics.start("write")
+        try:
+            count = super().write(data)
+        finally:
+            self._metrics.stop()
+        self._metrics.bytes_out += count or 0
+        return count
+
+
+class _CompressedIO(io.RawIOBase):
+    """Raw stream over a gzip, bz2 or lzma file object, owning the file beneath it"""
+
+    def __init__(self, codec_file, file, metrics=None):
+        self._codec_file = codec_file
+        self._file = file
+        self._metrics = metrics
+
+    def readable(self):
+        return self._codec_file.readable()
+
+    def writable(self):
+        return self._codec_file.writable()
+
+    def readinto(self, buffer):
+        if self._metrics is None:
+            return self._codec_file.readinto(buffer)
+        self._metrics.start("decompress")
+        try:
+            return self._codec_file.readinto(buffer)
+        finally:
+            self._metrics.stop()
+
+    def write(self, data):
+        if self._metrics is None:
+            return self._codec_file.write(data)
+        self._metrics.start("compress")
+        try:
+            return self._codec_file.write(data)
+        finally:
+            self._metrics.stop()
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            super().close()
+            self._codec_file.close()
+        finally:
+            self._file.close()
+
+
+class ConversionResult:
+    """Record of one input file's conversion: outputs, sizes, counts, stage timings and error"""
+
+    __slots__ = ("input_file", "output_format", "outputs", "bytes_in", "bytes_out", "rows",
+                 "seconds", "stages", "skipped", "error")
+
+    def __init__(self, input_file, output_format, outputs=(), metrics=None, seconds=0.0,
+                 skipped=False, error=None):
+        self.input_file = input_file
+        self.output_format = output_format
+        self.outputs = [outputs] if isinstance(outputs, str) else list(outputs)
+        self.bytes_in = metrics.bytes_in if metrics else 0
+        self.bytes_out = metrics.bytes_out if metrics else 0
+        self.rows = metrics.rows if metrics else 0
+        self.stages = dict(metrics.stages) if metrics else {}
+        self.seconds = seconds
+        self.skipped = skipped
+        self.error = error
+
+    def __repr__(self):
+        status = "skipped" if self.skipped else f"error={self.error!r}" if self.error else f"{self.seconds:.3f}s"
+        return f"<ConversionResult {self.input_file!r} -> {self.outputs!r} {status}>"
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    @property
+    def output(self):
+        """The output path, or the list of paths when several formats were requested"""
+        if isinstance(self.output_format, str):
+            return self.outputs[0] if self.outputs else None
+        return self.outputs
+
+    def as_dict(self):
+        """Plain-dict form, ready for json.dumps or a metrics pipeline"""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
 # ------------------------------
+# Streaming Writers
+# ------------------------------
+
+def _escape_xml_text(text):
+    """Escape character data the same way ElementTree does"""
+    if "&" in text:
+        text = text.replace("&", "&amp;")
+    if "<" in text:
+        text = text.replace("<", "&lt;")
+    if ">" in text:
+        text = text.replace(">", "&gt;")
+    return text
+
+
+def _escape_xml_attribute(text):
+    """Escape an attribute value the same way ElementTree does"""
+    text = _escape_xml_text(text)
+    if "\"" in text:
+        text = text.replace("\"", "&quot;")
+    if "\r" in text:
+        text = text.replace("\r", "&#13;")
+    if "\n" in text:
+        text = text.replace("\n", "&#10;")
+    if "\t" in text:
+        text = text.replace("\t", "&#09;")
+    return text
+
+
+def _xml_row(row):
+    """Render one row as <row><cell>...</cell></row> markup"""
+    cells = []
+    for cell_value in row:
+        text = "" if cell_value is None else str(cell_value)
+        cells.append(f"<cell>{_escape_xml_text(text)}</cell>" if text else "<cell />")
+    return f"<row>{''.join(cells)}</row>" if cells else "<row />"
+
+
+class _FramedRowWriter:
+    """Shared csv.writer-style interface for writers that frame their rows, whole or as fragments"""
+
+    _open = _separator = _close = _empty = ""
+
+    def __init__(self, out_file, fragment=False):
+        self._file = out_file
+        self._fragment = fragment
+        self._rows = 0
+
+    def _prefix(self):
+        if self._rows:
+            return self._separator
+        return "" if self._fragment else self._open
+
+    def writerow(self, row):
+        self._file.write(self._prefix() + self._encode(row))
+        self._rows += 1
+
+    def writerows(self, rows):
+        for row in rows:
+            self.writerow(row)
+
+    def writefragment(self, fragment_file):
+        """Append the rows of a non-empty fragment written by a fragment writer"""
+        self._file.write(self._prefix())
+        shutil.copyfileobj(fragment_file, self._file, _BUFFER_SIZE)
+        self._rows += 1
+
+    def close(self):
+        if not self._fragment:
+            self._file.write(self._close if self._rows else self._empty)
+
+
+class XmlRowWriter(_FramedRowWriter):
+    """Write rows as <rows><row><cell> markup one row at a time, as ElementTree would"""
+
+    _open, _close, _empty = "<rows>", "</rows>", "<rows />"
+    _encode = staticmethod(_xml_row)
+
+    def __init__(self, xml_file, fragment=False):
+        super().__init__(xml_file, fragment)
+        if not fragment:
+            xml_file.write(_XML_DECLARATION)
+
+
+# Cell types that JsonRowWriter can encode without nesting
+_JSON_SCALARS = frozenset((str, int, float, bool, type(None)))
+
+
+class JsonRowWriter(_FramedRowWriter):
+    """Write rows as a JSON array one row at a time, laid out as json.dump(rows, indent=4)"""
+
+    _empty = "[]"
+
+    def __init__(self, json_file, compact=False, fragment=False):
+        super().__init__(json_file, fragment)
+        if compact:
+            self._encode = json.JSONEncoder(separators=(",", ":")).encode
+            self._open, self._separator, self._close = "[", ",", "]"
+        else:
+            # A flat row's cells go through the C encoder, which indents them with its separator
+            encode_cells = json.JSONEncoder(separators=(",\n        ", ": ")).encode
+            encode_nested = json.JSONEncoder(indent=4).encode
+
+            def encode(row):
+                if type(row) is list and _JSON_SCALARS.issuperset(map(type, row)):
+                    return f"[\n        {encode_cells(row)[1:-1]}\n    ]" if row else "[]"
+                # Nest the row one level deeper; JSON strings never contain raw newlines
+                return encode_nested(row).replace("\n", "\n    ")
+
+            self._encode = encode
+            self._open, self._separator, self._close = "[\n    ", ",\n    ", "\n]"
+
+
+class NdjsonRowWriter(_FramedRowWriter):
+    """Write rows as JSON Lines (NDJSON): one compact JSON array per line"""
+
+    def __init__(self, ndjson_file, fragment=False):
+        super().__init__(ndjson_file, fragment)
+        encode = json.JSONEncoder(separators=(",", ":")).encode
+        self._encode = lambda row: encode(row) + "\n"
+
+
+class _CsvRowWriter:
+    """csv.writer with the close() and writefragment() the framed writers have, for uniform fan-out"""
+
+    def __init__(self, csv_file):
+        writer = csv.writer(csv_file)
+        self._file = csv_file
+        self.writerow = writer.writerow
+        self.writerows = writer.writerows
+
+    def writefragment(self, fragment_file):
+        shutil.copyfileobj(fragment_file, self._file, _BUFFER_SIZE)
+
+    def close(self):
+        pass
+
+
+def _make_row_writer(output_format, output_stream, compact=False, fragment=False):
+    """Wrap an open text stream in the row writer for output_format"""
+    if output_format == "csv":
+        return _CsvRowWriter(output_stream)
+    if output_format == "json":
+        return JsonRowWriter(output_stream, compact=compact, fragment=fragment)
+    if output_format == "ndjson":
+        return NdjsonRowWriter(output_stream, fragment=fragment)
+    return XmlRowWriter(output_stream, fragment=fragment)
+
+
+def split_format(path):
+    """Split a path into (base, format, compression): data.csv.gz -> ("data", "csv", "gz")"""
+    base, file_ext = os.path.splitext(path)
+    compression = file_ext[1:].lower()
+    if compression in _COMPRESSIONS:
+        base, file_ext = os.path.splitext(base)
+    else:
+        compression = None
+    return base, file_ext[1:].lower(), compression
+
+
+def _output_path(base, output_format, compression=None):
+    return f"{base}.{output_format}" if compression is None else f"{base}.{output_format}.{compression}"
+
+
+def _codec_file(binary_file, compression, mode, compression_level=None):
+    """Wrap an open binary file in the gzip, bz2 or lzma file object for compression"""
+    if compression == "gz":
+        import gzip
+        return gzip.GzipFile(fileobj=binary_file, mode=mode,
+                             compresslevel=9 if compression_level is None else compression_level)
+    if compression == "bz2":
+        import bz2
+        return bz2.BZ2File(binary_file, mode, compresslevel=9 if compression_level is None else compression_level)
+    import lzma
+    return lzma.LZMAFile(binary_file, mode, preset=compression_level)
+
+
+def _open_input(input_file, input_format, closefd=True, metrics=None):
+    """Open an input file (or file descriptor) the way its reader expects"""
+    newline = '' if input_format == "csv" else None
+    compression = split_format(input_file)[2] if isinstance(input_file, str) else None
+    if metrics is None and compression is None:
+        if input_format == "xml":
+            return open(input_file, 'rb', closefd=closefd)
+        return open(input_file, 'r', newline=newline, encoding='utf-8', closefd=closefd)
 
-def csv_to_json(input_file, output_file):
-    """Convert CSV to JSON"""
+    if metrics is not None:
+        stream = io.BufferedReader(_MeteredFileIO(input_file, 'r', metrics, closefd))
+    else:
+        stream = open(input_file, 'rb', closefd=closefd)
+    if compression is not None:
+        try:
+            codec_file = _codec_file(stream, compression, 'rb')
+        except BaseException:
+            stream.close()
+            raise
+        stream = io.BufferedReader(_CompressedIO(codec_file, stream, metrics), _BUFFER_SIZE)
+    if input_format == "xml":
+        return stream
+    return io.TextIOWrapper(stream, encoding='utf-8', newline=newline)
+
+
+# A named output is written under its name plus this suffix until it is complete
+_PARTIAL_SUFFIX = ".part"
+
+
+@contextmanager
+def _open_output(output_file, output_format, closefd=True, metrics=None, compression_level=None):
+    """Open an output file (or file descriptor) for buffered text writes, replaced only on success"""
+    if not isinstance(output_file, str):
+        with _open_output_stream(output_file, output_format, None, closefd, metrics,
+                                 compression_level) as output_stream:
+            yield output_stream
+        return
+    partial_file = output_file + _PARTIAL_SUFFIX
     try:
-        with open(input_file, 'r', newline='', encoding='utf-8') as csv_file:
-            reader = csv.reader(csv_file)
-            data = list(reader)
+        with _open_output_stream(partial_file, output_format, split_format(output_file)[2], closefd, metrics,
+                                 compression_level) as output_stream:
+            yield output_stream
+        os.replace(partial_file, output_file)
+    except BaseException:
+        try:
+            os.remove(partial_file)
+        except OSError:
+            pass
+        raise
+
+
+def _open_output_stream(output_file, output_format, compression, closefd=True, metrics=None,
+                        compression_level=None):
+    newline = '' if output_format in ("csv", "ndjson") else None
+    errors = 'xmlcharrefreplace' if output_format == "xml" else 'strict'
+    if metrics is None and compression is None:
+        return open(output_file, 'w', newline=newline, encoding='utf-8', errors=errors,
+                    buffering=_BUFFER_SIZE, closefd=closefd)
+
+    if metrics is not None:
+        stream = io.BufferedWriter(_MeteredFileIO(output_file, 'w', metrics, closefd), _BUFFER_SIZE)
+    else:
+        stream = open(output_file, 'wb', buffering=_BUFFER_SIZE, closefd=closefd)
+    if compression is not None:
+        try:
+            codec_file = _codec_file(stream, compression, 'wb', compression_level)
+        except BaseException:
+            stream.close()
+            raise
+        stream = io.BufferedWriter(_CompressedIO(codec_file, stream, metrics), _BUFFER_SIZE)
+    return io.TextIOWrapper(stream, encoding='utf-8', errors=errors, newline=newline)
+
+
+# ------------------------------
+# Streaming Readers
+# ------------------------------
+
+def iter_xml_rows(source):
+    """Yield the cell texts of each <row> under the root as it is parsed, clearing finished rows"""
+    root = None
+    depth = 0
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = elem
+            depth += 1
+            continue
+
+        depth -= 1
+        if depth == 1:
+            if elem.tag == "row":
+                yield [cell_elem.text if cell_elem.text else "" for cell_elem in elem.findall("cell")]
+            root.clear()
+
+
+_JSON_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_JSON_NUMBER_TAIL = re.compile(r"[0-9.eE+-]*")
+
+# A decode error this close to the end of the buffer may just be a token
+# (true, -1e5, a \uXXXX escape) cut off by the chunk boundary
+_JSON_TOKEN_TAIL = 16
+
+
+class JsonArrayReader:
+    """Incrementally read the elements of a top-level JSON array, one chunk of text at a time"""
+
+    def __init__(self, json_file, chunk_size=_CHUNK_SIZE):
+        self._file = json_file
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        self._offset = 0      # file position of _buffer[0], in characters
+        self._lines = 0       # newlines before _buffer[0]
+        self._line_start = 0  # file position where the line holding _buffer[0] starts
+        self.is_array = self._skip_whitespace() and self._buffer[self._pos] == "["
+
+    def _fill(self):
+        """Append the next chunk, growing reads while a single element spans them"""
+        size = max(self._chunk_size, len(self._buffer) - self._pos)
+        chunk = self._file.read(size)
+        self._advance(self._pos)
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        self._eof = not chunk
+
+    def _advance(self, count):
+        """Count the first count characters of the buffer as behind it"""
+        newlines = self._buffer.count("\n", 0, count)
+        if newlines:
+            self._lines += newlines
+            self._line_start = self._offset + self._buffer.rindex("\n", 0, count) + 1
+        self._offset += count
+
+    def _decode_error(self, e, start=0):
+        """e, from decoding the text from _buffer[start] on, with its position counted from the top of the file"""
+        base = self._offset + start
+        newlines = self._buffer.count("\n", 0, start)
+        line_start = self._offset + self._buffer.rindex("\n", 0, start) + 1 if newlines else self._line_start
+        pos = base + e.pos
+        lineno = self._lines + newlines + e.lineno
+        colno = e.colno + (base - line_start if e.lineno == 1 else 0)
+        error = json.JSONDecodeError(e.msg, e.doc, e.pos)
+        error.args = (f"{e.msg}: line {lineno} column {colno} (char {pos})",)
+        error.pos, error.lineno, error.colno = pos, lineno, colno
+        return error
+
+    def _skip_whitespace(self):
+        """Advance to the next significant character; False at end of input"""
+        while True:
+            self._pos = _JSON_WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return True
+            if self._eof:
+                return False
+            self._fill()
+
+    def _decode_value(self):
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError as e:
+                # Only an element cut off by the end of the buffer needs more input;
+                # anything else is a syntax error however much is read
+                if self._eof or (len(self._buffer) - e.pos > _JSON_TOKEN_TAIL
+                                 and not e.msg.startswith("Unterminated string")):
+                    raise self._decode_error(e) from None
+                self._fill()
+                continue
+            # A number running up to the buffer edge may continue in the next chunk
+            if not self._eof and _JSON_NUMBER_TAIL.match(self._buffer, end).end() == len(self._buffer):
+                self._fill()
+                continue
+            self._pos = end
+            return value
+
+    def __iter__(self):
+        if not self.is_array:
+            raise ValueError("JSON document is not an array")
+        self.is_array = False  # elements can only be consumed once
+        self._pos += 1
+
+        first = True
+        while True:
+            if not self._skip_whitespace():
+                raise ValueError("Unterminated JSON array")
+            if self._buffer[self._pos] == "]":
+                return
+            if not first:
+                if self._buffer[self._pos] != ",":
+                    raise ValueError(f"Expected ',' between JSON array elements, found {self._buffer[self._pos]!r}")
+                self._pos += 1
+                self._skip_whitespace()
+            yield self._decode_value()
+            first = False
+
+    def load(self):
+        """Decode the whole (remaining) document in one go"""
+        text = self._buffer[self._pos:] + self._file.read()
+        try:
+            try:
+                return json.loads(text)
+            except RecursionError:
+                return _decode_deep_json(text)
+        except json.JSONDecodeError as e:
+            raise self._decode_error(e, self._pos) from None
+
+
+def _decode_deep_json(text):
+    """Decode a JSON document with an explicit stack, so any depth loads"""
+    decoder = json.JSONDecoder()
+    skip = _JSON_WHITESPACE.match
+    stack = []      # [container, key of the next value] for each open container
+    result = None
+    pos = skip(text, 0).end()
+    expecting_value = True
+    while True:
+        if expecting_value:
+            char = text[pos:pos + 1]
+            if char in ("[", "{"):
+                value = [] if char == "[" else {}
+                pos = skip(text, pos + 1).end()
+                empty = text[pos:pos + 1] == ("]" if char == "[" else "}")
+            else:
+                value, pos = decoder.raw_decode(text, pos)
+                empty = True
+            if stack:
+                container, key = stack[-1]
+                if key is None:
+                    container.append(value)
+                else:
+                    container[key] = value
+            else:
+                result = value
+            if empty:
+                if char in ("[", "{"):
+                    pos += 1
+                expecting_value = False
+            else:
+                stack.append([value, None])
+                if char == "{":
+                    pos = _decode_json_key(decoder, text, pos, stack[-1])
+        else:
+            if not stack:
+                break
+            pos = skip(text, pos).end()
+            container = stack[-1][0]
+            char = text[pos:pos + 1]
+            if char == ",":
+                pos = skip(text, pos + 1).end()
+                if isinstance(container, dict):
+                    pos = _decode_json_key(decoder, text, pos, stack[-1])
+                expecting_value = True
+            elif char == ("]" if isinstance(container, list) else "}"):
+                pos += 1
+                stack.pop()
+            else:
+                raise json.JSONDecodeError("Expecting ',' delimiter", text, pos)
+            continue
+        pos = skip(text, pos).end()
+    if skip(text, pos).end() != len(text):
+        raise json.JSONDecodeError("Extra data", text, skip(text, pos).end())
+    return result
+
+
+def _decode_json_key(decoder, text, pos, entry):
+    """Read an object key and its colon at pos, storing the key in entry; returns the value's position"""
+    if text[pos:pos + 1] != '"':
+        raise json.JSONDecodeError("Expecting property name enclosed in double quotes", text, pos)
+    entry[1], pos = json.decoder.scanstring(text, pos + 1)
+    pos = _JSON_WHITESPACE.match(text, pos).end()
+    if text[pos:pos + 1] != ":":
+        raise json.JSONDecodeError("Expecting ':' delimiter", text, pos)
+    return _JSON_WHITESPACE.match(text, pos + 1).end()
+
+
+# Output formats written cell by cell, so every row must be a list of cells
+_LIST_ROW_FORMATS = ("csv", "xml")
+
+
+def _json_kind(value):
+    if isinstance(value, dict):
+        return "an object"
+    if isinstance(value, str):
+        return "a string"
+    if isinstance(value, bool):
+        return "a boolean"
+    if value is None:
+        return "null"
+    return "a number"
+
+
+def iter_ndjson_rows(ndjson_file, lists=False, first_line=1):
+    """Yield the JSON value on each line of an NDJSON file, skipping blank lines"""
+    for number, line in enumerate(ndjson_file, first_line):
+        if line.strip():
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Invalid JSON on line {number}, column {e.pos + 1}: {e.msg}") from None
+            if lists and not isinstance(row, list):
+                raise ValueError(f"Invalid row on line {number}: expected an array of cells, found {_json_kind(row)}")
+            yield row
+
+
+def _require_list_rows(rows):
+    for index, row in enumerate(rows):
+        if not isinstance(row, list):
+            raise ValueError(f"Invalid row at JSON array index {index}: expected an array of cells, "
+                             f"found {_json_kind(row)}")
+        yield row
+
+
+def _tree_rows(data):
+    """Rows of a nested {"tag": "rows"} document, as written by XML to JSON for rows XML"""
+    if not (isinstance(data, dict) and data.get("tag") == "rows"):
+        raise ValueError("JSON must contain a list of lists or a nested XML structure")
+    for row_dict in data.get("children", []):
+        if row_dict.get("tag") == "row":
+            yield [cell.get("text", "") for cell in row_dict.get("children", []) if cell.get("tag") == "cell"]
+
+
+# ------------------------------
+# Stream Conversion
+# ------------------------------
 
-        with open(output_file, 'w', encoding='utf-8') as json_file:
-            json.dump(data, json_file, indent=4)
+_FORMATS = ("csv", "json", "xml", "ndjson")
+
+# Output formats whose cells can carry numbers, for typed CSV conversion
+_TYPED_FORMATS = ("json", "ndjson")
+
+
+def _element_dict(element):
+    return {
+        "tag": element.tag,
+        "attributes": dict(element.attrib),
+        "text": element.text if element.text else "",
+        "children": []
+    }
+
+
+def xml_to_dict(element):
+    """Convert an Element into nested {"tag", "attributes", "text", "children"} dictionaries"""
+    root = _element_dict(element)
+    stack = [(element, root)]
+    while stack:
+        element, d = stack.pop()
+        for child in element:
+            child_dict = _element_dict(child)
+            d["children"].append(child_dict)
+            stack.append((child, child_dict))
+    return root
+
+
+def dict_to_xml(d):
+    """Rebuild an Element from the dictionaries produced by xml_to_dict (iteratively, like xml_to_dict)"""
+    root = ET.Element(d["tag"], d["attributes"])
+    root.text = d["text"]
+    stack = [(d, root)]
+    while stack:
+        d, elem = stack.pop()
+        for child_dict in d.get("children", []):
+            child_elem = ET.SubElement(elem, child_dict["tag"], child_dict["attributes"])
+            child_elem.text = child_dict["text"]
+            stack.append((child_dict, child_elem))
+    return root
+
+
+def _serialization_error(value):
+    return TypeError(f"cannot serialize {value!r} (type {type(value).__name__})")
+
+
+def write_dict_as_xml(data, xml_file, xml_declaration=False):
+    """Write a nested {"tag", "attributes", "text", "children"} document as XML"""
+    elements = 0
+    namespaced = False
+    stack = [data]
+    while stack:
+        d = stack.pop()
+        tag, attributes, text = d["tag"], d["attributes"], d["text"]
+        if not isinstance(attributes, dict):
+            raise TypeError(f"attrib must be dict, not {type(attributes).__name__}")
+        for name in (tag, *attributes):
+            if not isinstance(name, str):
+                raise _serialization_error(name)
+            namespaced = namespaced or name.startswith("{")
+        for value in (text, *attributes.values()) if text else attributes.values():
+            if not isinstance(value, str):
+                raise _serialization_error(value)
+        stack.extend(d.get("children", []))
+        elements += 1
+
+    if xml_declaration:
+        xml_file.write(_XML_DECLARATION)
+    if namespaced:
+        # ElementTree assigns the namespace prefixes, but serializes recursively
+        ET.ElementTree(dict_to_xml(data)).write(xml_file, encoding="unicode")
+        return elements
+
+    write = xml_file.write
+    stack = [data]  # dictionaries still to write, or closing tags
+    while stack:
+        d = stack.pop()
+        if isinstance(d, str):
+            write(d)
+            continue
+        tag, text, children = d["tag"], d["text"], d.get("children", [])
+        markup = "<" + tag + "".join(f' {name}="{_escape_xml_attribute(value)}"'
+                                     for name, value in d["attributes"].items())
+        if text or children:
+            write(f"{markup}>{_escape_xml_text(text) if text else ''}")
+            stack.append(f"</{tag}>")
+            stack.extend(reversed(children))
+        else:
+            write(markup + " />")
+    return elements
+
+
+def stream_xml_to_json(source, json_file, compact=False, metrics=None):
+    """Write the xml_to_dict form of an XML document as JSON while it is parsed"""
+    encode = json.JSONEncoder().encode
+    if compact:
+        encode_attributes = json.JSONEncoder(separators=(",", ":")).encode
+        newline, unit, colon = "", "", ":"
+    else:
+        encode_attributes = json.JSONEncoder(indent=4).encode
+        newline, unit, colon = "\n", "    ", ": "
+
+    def header(element, level):
+        """Everything up to the children list of an element whose dict is nested level deep"""
+        inner = newline + unit * (level + 1)
+        attributes = encode_attributes(dict(element.attrib)) if element.attrib else "{}"
+        if not compact:
+            attributes = attributes.replace("\n", inner)
+        return (f'{{{inner}"tag"{colon}{encode(element.tag)},{inner}"attributes"{colon}{attributes},'
+                f'{inner}"text"{colon}{encode(element.text or "")},{inner}"children"{colon}')
+
+    write = json_file.write
+    stack = []  # [element, children written yet] per open element
+    elements = 0
+    events = _metered_rows(ET.iterparse(source, events=("start", "end")), metrics, count=False)
+    with _stage(metrics, "serialize"):
+        for event, element in events:
+            if event == "start":
+                if stack:
+                    parent = stack[-1]
+                    level = 2 * len(stack)
+                    if parent[1]:
+                        write(f",{newline}{unit * level}")
+                    else:
+                        # The parent's text is complete once its first child starts
+                        write(f"{header(parent[0], level - 2)}[{newline}{unit * level}")
+                        parent[1] = True
+                stack.append([element, False])
+                continue
+
+            element, has_children = stack.pop()
+            level = 2 * len(stack)
+            if has_children:
+                write(f"{newline}{unit * (level + 1)}]{newline}{unit * level}}}")
+            else:
+                write(f"{header(element, level)}[]{newline}{unit * level}}}")
+            if stack:
+                # Already written, so drop finished children (and the parent's written text)
+                stack[-1][0].clear()
+            elements += 1
+    if metrics is not None:
+        metrics.rows += elements
+
+
+def convert_stream(input_stream, output_stream, input_format, output_format, compact=False, typed=False,
+                   metrics=None):
+    """Convert the document read from input_stream into output_stream"""
+    input_format = input_format.lower()
+    output_format = output_format.lower()
+    for file_format in (input_format, output_format):
+        if file_format not in _FORMATS:
+            raise ValueError(f"Unsupported file format: {file_format}")
+
+    if input_format == output_format:
+        if not isinstance(input_stream, io.TextIOBase):
+            # XML is read as bytes, so copy them beneath the output's text layer
+            output_stream.flush()
+            output_stream = output_stream.buffer
+        shutil.copyfileobj(input_stream, output_stream, _BUFFER_SIZE)
+        return
+
+    if input_format == "xml" and output_format == "json":
+        stream_xml_to_json(input_stream, output_stream, compact=compact, metrics=metrics)
+        return
+
+    if input_format == "csv":
+        rows = _metered_rows(csv.reader(input_stream), metrics)
+        if typed and output_format in _TYPED_FORMATS:
+            with _stage(metrics, "build"):
+                table = ColumnarTable.from_rows(rows)
+            rows = _metered_rows(table.iterrows(), metrics, "build")
+    elif input_format == "xml":
+        rows = _metered_rows(iter_xml_rows(input_stream), metrics)
+    elif input_format == "ndjson":
+        rows = _metered_rows(iter_ndjson_rows(input_stream, lists=output_format in _LIST_ROW_FORMATS), metrics)
+    else:
+        with _stage(metrics, "parse"):
+            reader = JsonArrayReader(input_stream)
+        if not reader.is_array:
+            with _stage(metrics, "parse"):
+                data = reader.load()
+            if output_format == "xml":
+                # Nested {"tag", "attributes", "text", "children"} documents are loaded whole, then written without an element tree
+                if not (isinstance(data, dict) and "tag" in data):
+                    raise ValueError("JSON format not recognized for XML conversion")
+                with _stage(metrics, "serialize"):
+                    elements = write_dict_as_xml(data, output_stream, xml_declaration=True)
+                if metrics is not None:
+                    metrics.rows += elements
+                return
+            rows = _metered_rows(_tree_rows(data), metrics)
+        elif output_format in _LIST_ROW_FORMATS:
+            rows = _metered_rows(_require_list_rows(reader), metrics)
+        else:
+            rows = _metered_rows(reader, metrics)
+
+    with _stage(metrics, "serialize"):
+        writer = _make_row_writer(output_format, output_stream, compact)
+        writer.writerows(rows)
+        writer.close()
+
+
+def _convert_file(input_file, output_file, input_format, output_format, compact=False, typed=False,
+                  metrics=None, compression_level=None):
+    with _open_input(input_file, input_format, metrics=metrics) as input_stream, \
+            _open_output(output_file, output_format, metrics=metrics,
+                         compression_level=compression_level) as output_stream:
+        convert_stream(input_stream, output_stream, input_format, output_format, compact=compact, typed=typed,
+                       metrics=metrics)
+
+
+# ------------------------------
+# File Conversion Functions
+# ------------------------------
+
+def csv_to_json(input_file, output_file, compact=False, typed=False, metrics=None, compression_level=None):
+    """Convert CSV to JSON, encoding each row as it is read"""
+    try:
+        _convert_file(input_file, output_file, "csv", "json", compact=compact, typed=typed, metrics=metrics,
+                      compression_level=compression_level)
 
     except Exception as e:
         raise RuntimeError(f"Error converting CSV to JSON: {e}")
 
 
-def json_to_csv(input_file, output_file):
-    """Convert JSON to CSV"""
+def json_to_csv(input_file, output_file, metrics=None, compression_level=None):
+    """Convert JSON to CSV, streaming the rows of a top-level array"""
     try:
-        with open(input_file, 'r', encoding='utf-8') as json_file:
-            data = json.load(json_file)
-
-        with open(output_file, 'w', newline='', encoding='utf-8') as csv_file:
-            writer = csv.writer(csv_file)
-            writer.writerows(data)
+        _convert_file(input_file, output_file, "json", "csv", metrics=metrics, compression_level=compression_level)
 
     except Exception as e:
         raise RuntimeError(f"Error converting JSON to CSV: {e}")
 
 
-def csv_to_xml(input_file, output_file):
-    """Convert CSV to XML"""
+def csv_to_xml(input_file, output_file, metrics=None, compression_level=None):
+    """Convert CSV to XML, streaming each row straight to the output file"""
     try:
-        with open(input_file, 'r', newline='', encoding='utf-8') as csv_file:
-            reader = csv.reader(csv_file)
-            data = list(reader)
+        _convert_file(input_file, output_file, "csv", "xml", metrics=metrics, compression_level=compression_level)
+
+    except Exception as e:
+        raise RuntimeError(f"Error converting CSV to XML: {e}")
 
-        root = ET.Element("rows")
-        for row in data:
-            row_elem = ET.SubElement(root, "row")
-            for cell_value in row:
-                cell_elem = ET.SubElement(row_elem, "cell")
-                cell_elem.text = cell_value if cell_value is not None else ""
 
-        tree = ET.ElementTree(root)
-        tree.write(output_file, encoding="utf-8", xml_declaration=True)
+def xml_to_csv(input_file, output_file, metrics=None, compression_level=None):
+    """Convert XML to CSV, writing each <row> as soon as it is parsed"""
+    try:
+        _convert_file(input_file, output_file, "xml", "csv", metrics=metrics, compression_level=compression_level)
 
     except Exception as e:
-        raise RuntimeError(f"Error converting CSV to XML: {e}")
+        raise RuntimeError(f"Error converting XML to CSV: {e}")
 
 
-def xml_to_csv(input_file, output_file):
-    """Convert XML to CSV"""
+def xml_to_json(input_file, output_file, compact=False, metrics=None, compression_level=None):
+    """Convert XML to JSON"""
     try:
-        tree = ET.parse(input_file)
-        root = tree.getroot()
+        _convert_file(input_file, output_file, "xml", "json", compact=compact, metrics=metrics,
+                      compression_level=compression_level)
 
-        data = []
-        for row_elem in root.findall("row"):
-            row_data = [cell_elem.text if cell_elem.text else "" for cell_elem in row_elem.findall("cell")]
-            data.append(row_data)
+    except Exception as e:
+        raise RuntimeError(f"Error converting XML to JSON: {e}")
 
-        with open(output_file, 'w', newline='', encoding='utf-8') as csv_file:
-            writer = csv.writer(csv_file)
-            writer.writerows(data)
+
+def json_to_xml(input_file, output_file, metrics=None, compression_level=None):
+    """Convert JSON to XML, streaming list-of-lists rows when possible"""
+    try:
+        _convert_file(input_file, output_file, "json", "xml", metrics=metrics, compression_level=compression_level)
 
     except Exception as e:
-        raise RuntimeError(f"Error converting XML to CSV: {e}")
+        raise RuntimeError(f"Error converting JSON to XML: {e}")
 
 
-def xml_to_json(input_file, output_file):
-    """Convert XML to JSON"""
+def csv_to_ndjson(input_file, output_file, typed=False, metrics=None, compression_level=None):
+    """Convert CSV to NDJSON, one JSON array per row and line"""
     try:
-        tree = ET.parse(input_file)
-        root = tree.getroot()
+        _convert_file(input_file, output_file, "csv", "ndjson", typed=typed, metrics=metrics,
+                      compression_level=compression_level)
 
-        def xml_to_dict(element):
-            return {
-                "tag": element.tag,
-                "attributes": dict(element.attrib),
-                "text": element.text if element.text else "",
-                "children": [xml_to_dict(child) for child in element]
-            }
+    except Exception as e:
+        raise RuntimeError(f"Error converting CSV to NDJSON: {e}")
 
-        data_dict = xml_to_dict(root)
 
-        with open(output_file, 'w', encoding='utf-8') as json_file:
-            json.dump(data_dict, json_file, indent=4)
+def ndjson_to_csv(input_file, output_file, metrics=None, compression_level=None):
+    """Convert NDJSON to CSV, writing each line's row as soon as it is parsed"""
+    try:
+        _convert_file(input_file, output_file, "ndjson", "csv", metrics=metrics, compression_level=compression_level)
 
     except Exception as e:
-        raise RuntimeError(f"Error converting XML to JSON: {e}")
+        raise RuntimeError(f"Error converting NDJSON to CSV: {e}")
 
 
-def json_to_xml(input_file, output_file):
-    """Convert JSON to XML"""
+def xml_to_ndjson(input_file, output_file, metrics=None, compression_level=None):
+    """Convert rows XML to NDJSON, one line per <row>"""
     try:
-        with open(input_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        _convert_file(input_file, output_file, "xml", "ndjson", metrics=metrics, compression_level=compression_level)
+
+    except Exception as e:
+        raise RuntimeError(f"Error converting XML to NDJSON: {e}")
 
-        def dict_to_xml(d):
-            elem = ET.Element(d["tag"], d["attributes"])
-            elem.text = d["text"]
-            for child_dict in d.get("children", []):
-                child_elem = dict_to_xml(child_dict)
-                elem.append(child_elem)
-            return elem
 
-        root_elem = dict_to_xml(data)
-        tree = ET.ElementTree(root_elem)
-        tree.write(output_file, encoding="utf-8", xml_declaration=True)
+def ndjson_to_xml(input_file, output_file, metrics=None, compression_level=None):
+    """Convert NDJSON rows to <rows><row><cell> XML"""
+    try:
+        _convert_file(input_file, output_file, "ndjson", "xml", metrics=metrics, compression_level=compression_level)
 
     except Exception as e:
-        raise RuntimeError(f"Error converting JSON to XML: {e}")
+        raise RuntimeError(f"Error converting NDJSON to XML: {e}")
+
+
+def json_to_ndjson(input_file, output_file, metrics=None, compression_level=None):
+    """Convert a JSON array (or nested rows document) to NDJSON, one element per line"""
+    try:
+        _convert_file(input_file, output_file, "json", "ndjson", metrics=metrics, compression_level=compression_level)
+
+    except Exception as e:
+        raise RuntimeError(f"Error converting JSON to NDJSON: {e}")
+
+
+def ndjson_to_json(input_file, output_file, compact=False, metrics=None, compression_level=None):
+    """Convert NDJSON to a JSON array of its lines' values"""
+    try:
+        _convert_file(input_file, output_file, "ndjson", "json", compact=compact, metrics=metrics,
+                      compression_level=compression_level)
+
+    except Exception as e:
+        raise RuntimeError(f"Error converting NDJSON to JSON: {e}")
+
+
+# ------------------------------
+# Parallel CSV and NDJSON Conversion
+# ------------------------------
+
+def _count_quotes(mm, start, end):
+    """Count double quotes in mm[start:end] without copying it all at once"""
+    count = 0
+    for block_start in range(start, end, _BUFFER_SIZE):
+        count += mm[block_start:min(block_start + _BUFFER_SIZE, end)].count(b'"')
+    return count
+
+
+def find_csv_chunks(input_file, chunk_size=_SPLIT_SIZE):
+    """Split a CSV file into byte ranges that begin and end on record boundaries"""
+    import mmap
+
+    size = os.path.getsize(input_file)
+    if not size:
+        return []
+
+    chunks = []
+    with open(input_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start = 0
+        in_quotes = False
+        while size - start > chunk_size:
+            pos = start + chunk_size
+            # RFC 4180 quoting: quotes only appear around fields or doubled inside them
+            in_quotes ^= _count_quotes(mm, start, pos) & 1
+            # Walk forward line by line until a newline falls outside quotes
+            while pos < size:
+                newline = mm.find(b"\n", pos)
+                end = size if newline < 0 else newline + 1
+                in_quotes ^= mm[pos:end].count(b'"') & 1
+                pos = end
+                if not in_quotes:
+                    break
+            chunks.append((start, pos))
+            start = pos
+        if start < size:
+            chunks.append((start, size))
+    return chunks
+
+
+def find_line_chunks(input_file, chunk_size=_SPLIT_SIZE):
+    """Split an NDJSON file into byte ranges that end just after a newline"""
+    import mmap
+
+    size = os.path.getsize(input_file)
+    if not size:
+        return []
+
+    chunks = []
+    with open(input_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start = 0
+        while size - start > chunk_size:
+            newline = mm.find(b"\n", start + chunk_size - 1)
+            end = size if newline < 0 else newline + 1
+            chunks.append((start, end))
+            start = end
+        if start < size:
+            chunks.append((start, size))
+    return chunks
+
+
+class _ByteRange(io.RawIOBase):
+    """Raw reader limited to the next `length` bytes of an open binary file"""
+
+    def __init__(self, raw_file, length):
+        self._raw_file = raw_file
+        self._remaining = length
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        count = self._raw_file.readinto(memoryview(buffer)[:self._remaining])
+        self._remaining -= count
+        return count
+
+
+def _open_chunk(raw_file, start, end, input_format):
+    raw_file.seek(start)
+    return io.TextIOWrapper(io.BufferedReader(_ByteRange(raw_file, end - start), _BUFFER_SIZE),
+                            encoding='utf-8', newline='' if input_format == "csv" else None)
+
+
+def _convert_chunk(input_file, start, end, input_format, output_format, fragment_file, compact=False):
+    """Convert one byte range of a CSV or NDJSON file into an output fragment; returns the row count"""
+    lists = output_format in _LIST_ROW_FORMATS
+    with open(input_file, 'rb', buffering=0) as raw_file:
+        chunk = _open_chunk(raw_file, start, end, input_format)
+        if input_format == "csv":
+            rows = csv.reader(chunk)
+        else:
+            rows = iter_ndjson_rows(chunk, lists=lists)
+        try:
+            # Fragments are copied into a text-mode output later, so skip newline translation here
+            with open(fragment_file, 'w', newline='', encoding='utf-8', errors='xmlcharrefreplace',
+                      buffering=_BUFFER_SIZE) as out_file:
+                writer = _make_row_writer(output_format, out_file, compact, fragment=True)
+                count = 0
+                for row in rows:
+                    writer.writerow(row)
+                    count += 1
+        except ValueError:
+            if input_format != "ndjson":
+                raise
+            # Chunks start on a line boundary, so count the lines before this one and
+            # re-read it to raise the error with its line number in the whole file
+            raw_file.seek(0)
+            first_line = 1 + sum(block.count(b"\n") for block in iter(lambda: raw_file.read(
+                min(_BUFFER_SIZE, start - raw_file.tell())), b""))
+            for _ in iter_ndjson_rows(_open_chunk(raw_file, start, end, input_format), lists, first_line):
+                pass
+            raise
+    return count
+
+
+# Input formats whose records can be found by scanning bytes, and so split for parallel conversion
+_SPLITTERS = {"csv": find_csv_chunks, "ndjson": find_line_chunks}
+
+
+def parallel_conversion(input_file, output_file, output_format, compact=False,
+                        chunk_size=_SPLIT_SIZE, max_workers=None, metrics=None, compression_level=None):
+    """Convert a large CSV or NDJSON file to another format using several processes"""
+    import tempfile
+
+    input_format = split_format(input_file)[1]
+    output_format = output_format.lower()
+    if input_format not in _SPLITTERS or output_format not in _FORMATS or output_format == input_format:
+        raise ValueError(f"Parallel conversion from {input_format} to {output_format} is not supported")
+
+    if split_format(input_file)[2] is not None:
+        chunks = []
+    else:
+        with _stage(metrics, "split"):
+            chunks = _SPLITTERS[input_format](input_file, chunk_size)
+    if len(chunks) <= 1:
+        _convert_file(input_file, output_file, input_format, output_format, compact=compact, metrics=metrics,
+                      compression_level=compression_level)
+        return
+
+    output_dir = os.path.dirname(os.path.abspath(output_file))
+    fragment_files = []
+    try:
+        for _ in chunks:
+            fd, fragment_file = tempfile.mkstemp(suffix=".part", dir=output_dir)
+            os.close(fd)
+            fragment_files.append(fragment_file)
+
+        with make_executor("process", max_workers) as executor:
+            futures = [executor.submit(_convert_chunk, input_file, start, end, input_format, output_format,
+                                       fragment_file, compact)
+                       for (start, end), fragment_file in zip(chunks, fragment_files)]
+            try:
+                with _open_output(output_file, output_format, metrics=metrics,
+                                  compression_level=compression_level) as out_file:
+                    writer = _make_row_writer(output_format, out_file, compact)
+                    for future, fragment_file in zip(futures, fragment_files):
+                        with _stage(metrics, "convert"):
+                            rows = future.result()
+                        with _stage(metrics, "stitch"):
+                            if os.path.getsize(fragment_file):
+                                with open(fragment_file, 'r', newline='', encoding='utf-8') as f:
+                                    writer.writefragment(f)
+                            os.remove(fragment_file)
+                        if metrics is not None:
+                            metrics.rows += rows
+                    writer.close()
+                if metrics is not None:
+                    metrics.bytes_in += chunks[-1][1]
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+    finally:
+        for fragment_file in fragment_files:
+            if os.path.exists(fragment_file):
+                os.remove(fragment_file)
+
+
+# ------------------------------
+# Row Access
+# ------------------------------
+
+def read_rows(input_file, start=0, stop=None, metrics=None, lists=False):
+    """Yield rows start..stop-1 of a CSV, JSON, NDJSON or rows XML file"""
+    _, input_format, compression = split_format(input_file)
+    if input_format not in _FORMATS:
+        raise ValueError("Unsupported file format")
+    skip = start
+    with _open_input(input_file, input_format, metrics=metrics) as input_stream:
+        if input_format == "csv":
+            if start and compression is None:
+                with _stage(metrics, "index"):
+                    offset, skip = csv_row_index(input_file).seek(start)
+                input_stream.seek(offset)
+            rows = csv.reader(input_stream)
+        elif input_format == "xml":
+            rows = iter_xml_rows(input_stream)
+        elif input_format == "ndjson":
+            rows = iter_ndjson_rows(input_stream, lists=lists)
+        else:
+            reader = JsonArrayReader(input_stream)
+            if not reader.is_array:
+                rows = _tree_rows(reader.load())
+            else:
+                rows = _require_list_rows(reader) if lists else reader
+        yield from itertools.islice(rows, skip, None if stop is None else skip + max(stop - start, 0))
+
+
+def convert_rows(input_file, output_file, output_format, start=0, stop=None, compact=False, typed=False,
+                 metrics=None, compression_level=None):
+    """Convert rows start..stop-1 of input_file (see read_rows) into output_file"""
+    output_format = output_format.lower()
+    if output_format not in _FORMATS:
+        raise ValueError(f"Unsupported output format: {output_format}")
+    lists = output_format in _LIST_ROW_FORMATS
+    rows = _metered_rows(read_rows(input_file, start, stop, metrics=metrics, lists=lists), metrics)
+    with _open_output(output_file, output_format, metrics=metrics,
+                      compression_level=compression_level) as output_stream:
+        if typed and output_format in _TYPED_FORMATS:
+            if start:
+                rows = itertools.chain(read_rows(input_file, 0, 1, lists=lists), rows)
+            with _stage(metrics, "build"):
+                table = ColumnarTable.from_rows(rows)
+            rows = _metered_rows(table.iterrows(), metrics, "build")
+        with _stage(metrics, "serialize"):
+            writer = _make_row_writer(output_format, output_stream, compact)
+            writer.writerows(rows)
+            writer.close()
+
+
+# ------------------------------
+# Single-Parse Fan-Out
+# ------------------------------
+
+def _output_base(input_file, output_dir=None):
+    """Output path minus extensions: beside the input, or in output_dir (created if needed)"""
+    base = split_format(input_file)[0]
+    if output_dir is None:
+        return base
+    os.makedirs(output_dir, exist_ok=True)
+    return os.path.join(output_dir, os.path.basename(base))
+
+
+def _output_compression(input_file, compression=None, compression_level=None):
+    """Compression suffix for outputs: the input's own unless compression names one ("none" for none)"""
+    if compression is None:
+        output_compression = split_format(input_file)[2]
+    elif compression.lower() == "none":
+        output_compression = None
+    elif compression.lower() in _COMPRESSIONS:
+        output_compression = compression.lower()
+    else:
+        raise ValueError(f"Unsupported compression: {compression}")
+    if compression_level is not None and output_compression is not None:
+        low, high = _COMPRESSION_LEVELS[output_compression]
+        if not low <= compression_level <= high:
+            raise ValueError(f"{output_compression} compression level must be between {low} and {high}, "
+                             f"not {compression_level}")
+    return output_compression
+
+
+def _check_compression(compression, compression_level=None):
+    """Check a batch's compression options before any file is converted"""
+    if compression is not None:
+        _output_compression("", compression, compression_level)
+
+
+def convert_to_formats(input_file, output_formats, compact=False, typed=False, metrics=None, output_dir=None,
+                       compression=None, compression_level=None):
+    """Convert one input file into several output formats with a single parse"""
+    input_format = split_format(input_file)[1]
+    if input_format not in _FORMATS:
+        raise ValueError("Unsupported file format")
+    base = _output_base(input_file, output_dir)
+    output_compression = _output_compression(input_file, compression, compression_level)
+
+    def output_path(output_format):
+        return _output_path(base, output_format, output_compression)
+
+    formats = list(dict.fromkeys(output_format.lower() for output_format in output_formats))
+    for output_format in formats:
+        if output_format not in _FORMATS:
+            raise ValueError(f"Unsupported output format: {output_format}")
+    targets = [output_format for output_format in formats if output_format != input_format]
+
+    row_targets, tree_targets = targets, []
+    with ExitStack() as stack:
+        input_stream = stack.enter_context(_open_input(input_file, input_format, metrics=metrics))
+        if input_format == "csv":
+            rows = _metered_rows(csv.reader(input_stream), metrics)
+            if typed and any(output_format in _TYPED_FORMATS for output_format in targets):
+                with _stage(metrics, "build"):
+                    table = ColumnarTable.from_rows(rows)
+                for output_format in targets:
+                    with _open_output(output_path(output_format), output_format, metrics=metrics,
+                                      compression_level=compression_level) as output_stream, \
+                            _stage(metrics, "serialize"):
+                        writer = _make_row_writer(output_format, output_stream, compact)
+                        writer.writerows(_metered_rows(table.iterrows(typed=output_format in _TYPED_FORMATS),
+                                                       metrics, "build"))
+                        writer.close()
+                row_targets = []
+        elif input_format == "json":
+            with _stage(metrics, "parse"):
+                reader = JsonArrayReader(input_stream)
+            if not reader.is_array:
+                row_targets, tree_targets = [], targets
+            lists = any(output_format in _LIST_ROW_FORMATS for output_format in row_targets)
+            rows = _metered_rows(_require_list_rows(reader) if lists else reader, metrics)
+        elif input_format == "ndjson":
+            lists = any(output_format in _LIST_ROW_FORMATS for output_format in targets)
+            rows = _metered_rows(iter_ndjson_rows(input_stream, lists=lists), metrics)
+        else:
+            row_targets = [output_format for output_format in targets if output_format != "json"]
+            tree_targets = [output_format for output_format in targets if output_format == "json"]
+            rows = _metered_rows(iter_xml_rows(input_stream), metrics)
+
+        if row_targets:
+            writers = [_make_row_writer(output_format,
+                                        stack.enter_context(_open_output(output_path(output_format), output_format,
+                                                                         metrics=metrics,
+                                                                         compression_level=compression_level)),
+                                        compact)
+                       for output_format in row_targets]
+            with _stage(metrics, "serialize"):
+                for row in rows:
+                    for writer in writers:
+                        writer.writerow(row)
+                for writer in writers:
+                    writer.close()
+
+    for output_format in tree_targets:
+        output_file = output_path(output_format)
+        if input_format == "xml":
+            xml_to_json(input_file, output_file, compact=compact, metrics=metrics, compression_level=compression_level)
+        elif output_format == "csv":
+            json_to_csv(input_file, output_file, metrics=metrics, compression_level=compression_level)
+        elif output_format == "ndjson":
+            json_to_ndjson(input_file, output_file, metrics=metrics, compression_level=compression_level)
+        else:
+            json_to_xml(input_file, output_file, metrics=metrics, compression_level=compression_level)
+
+    if input_format in formats and os.path.abspath(output_path(input_format)) != os.path.abspath(input_file):
+        _convert_file(input_file, output_path(input_format), input_format, input_format, metrics=metrics,
+                      compression_level=compression_level)
+
+    return [output_path(output_format) for output_format in formats]
 
 
 # ------------------------------
 # Process Conversion
 # ------------------------------
 
-def process_conversion(input_file, output_format):
+def process_conversion(input_file, output_format, compact=False, parallel=False, max_workers=None,
+                       typed=False, metrics=None, output_dir=None, compression=None, compression_level=None,
+                       row_range=None):
     """Determine the appropriate conversion function based on file extension"""
-    file_ext = os.path.splitext(input_file)[1].lower()
-    output_file = os.path.splitext(input_file)[0] + f".{output_format.lower()}"
+    if not isinstance(output_format, str):
+        if row_range is not None:
+            raise RuntimeError("Conversion failed: a row range is converted to one output format at a time")
+        try:
+            return convert_to_formats(input_file, output_format, compact=compact, typed=typed, metrics=metrics,
+                                      output_dir=output_dir, compression=compression,
+                                      compression_level=compression_level)
+        except Exception as e:
+            raise RuntimeError(f"Conversion failed: {e}")
+
+    file_ext = "." + split_format(input_file)[1]
 
     try:
-        if file_ext == ".csv":
+        if output_format.lower() not in _FORMATS:
+            raise ValueError(f"Unsupported output format: {output_format}")
+        output_file = _output_path(_output_base(input_file, output_dir), output_format.lower(),
+                                   _output_compression(input_file, compression, compression_level))
+        if row_range is not None:
+            if file_ext[1:] not in _FORMATS:
+                raise ValueError("Unsupported file format")
+            if os.path.abspath(output_file) == os.path.abspath(input_file):
+                raise ValueError("A row range in the input's own format needs an output_dir or compression")
+            convert_rows(input_file, output_file, output_format, *row_range, compact=compact, typed=typed,
+                         metrics=metrics, compression_level=compression_level)
+        elif file_ext == f".{output_format.lower()}":
+            if os.path.abspath(output_file) != os.path.abspath(input_file):
+                _convert_file(input_file, output_file, file_ext[1:], file_ext[1:], metrics=metrics,
+                              compression_level=compression_level)
+        elif parallel and file_ext[1:] in _SPLITTERS and output_format.lower() in _FORMATS and not typed:
+            parallel_conversion(input_file, output_file, output_format, compact=compact, max_workers=max_workers,
+                                metrics=metrics, compression_level=compression_level)
+        elif file_ext == ".csv":
             if output_format.lower() == "json":
-                csv_to_json(input_file, output_file)
+                csv_to_json(input_file, output_file, compact=compact, typed=typed, metrics=metrics,
+                            compression_level=compression_level)
             elif output_format.lower() == "xml":
-                csv_to_xml(input_file, output_file)
+                csv_to_xml(input_file, output_file, metrics=metrics, compression_level=compression_level)
+            elif output_format.lower() == "ndjson":
+                csv_to_ndjson(input_file, output_file, typed=typed, metrics=metrics,
+                              compression_level=compression_level)
         elif file_ext == ".json":
             if output_format.lower() == "csv":
-                json_to_csv(input_file, output_file)
+                json_to_csv(input_file, output_file, metrics=metrics, compression_level=compression_level)
             elif output_format.lower() == "xml":
-                json_to_xml(input_file, output_file)
+                json_to_xml(input_file, output_file, metrics=metrics, compression_level=compression_level)
+            elif output_format.lower() == "ndjson":
+                json_to_ndjson(input_file, output_file, metrics=metrics, compression_level=compression_level)
         elif file_ext == ".xml":
             if output_format.lower() == "csv":
-                xml_to_csv(input_file, output_file)
+                xml_to_csv(input_file, output_file, metrics=metrics, compression_level=compression_level)
+            elif output_format.lower() == "json":
+                xml_to_json(input_file, output_file, compact=compact, metrics=metrics,
+                            compression_level=compression_level)
+            elif output_format.lower() == "ndjson":
+                xml_to_ndjson(input_file, output_file, metrics=metrics, compression_level=compression_level)
+        elif file_ext == ".ndjson":
+            if output_format.lower() == "csv":
+                ndjson_to_csv(input_file, output_file, metrics=metrics, compression_level=compression_level)
             elif output_format.lower() == "json":
-                xml_to_json(input_file, output_file)
+                ndjson_to_json(input_file, output_file, compact=compact, metrics=metrics,
+                               compression_level=compression_level)
+            elif output_format.lower() == "xml":
+                ndjson_to_xml(input_file, output_file, metrics=metrics, compression_level=compression_level)
         else:
             raise ValueError("Unsupported file format")
 
@@ -155,20 +1482,563 @@ def process_conversion(input_file, output_format):
         raise RuntimeError(f"Conversion failed: {e}")
 
 
+def convert_file(input_file, output_format, compact=False, parallel=False, max_workers=None, typed=False,
+                 output_dir=None, compression=None, compression_level=None, row_range=None):
+    """Run process_conversion with instrumentation and return a ConversionResult"""
+    metrics = ConversionMetrics()
+    start = time.perf_counter()
+    try:
+        output = process_conversion(input_file, output_format, compact=compact, parallel=parallel,
+                                    max_workers=max_workers, typed=typed, metrics=metrics, output_dir=output_dir,
+                                    compression=compression, compression_level=compression_level,
+                                    row_range=row_range)
+    except Exception as e:
+        return ConversionResult(input_file, output_format, metrics=metrics,
+                                seconds=time.perf_counter() - start, error=str(e))
+    return ConversionResult(input_file, output_format, output, metrics, time.perf_counter() - start)
+
+
 # ------------------------------
 # Batch Processing
 # ------------------------------
 
-def batch_process(folder_path, output_format):
-    """Process multiple files in batch with concurrent execution"""
-    files = [os.path.join(folder_path, f) for f in os.listdir(folder_path) if f.endswith(('.csv', '.json', '.xml'))]
+_BACKENDS = {"thread": "ThreadPoolExecutor", "process": "ProcessPoolExecutor"}
+
+# batch_process and FolderWatcher keep at most this many jobs per worker submitted at once
+_IN_FLIGHT_PER_WORKER = 2
+
+# How often (in seconds) a cancellable batch checks whether it was cancelled
+_CANCEL_POLL = 0.1
+
+
+# Peak memory of the conversions that hold their whole input in memory, as a
+# multiple of the (uncompressed) input size. Nested, non-array JSON documents
+# are decoded whole, and typed CSV goes through a ColumnarTable; every other
+# conversion streams in about _STREAMING_MEMORY, whatever the input's size.
+_MEMORY_EXPANSION = {
+    ("json", "csv"): 8.0,
+    ("json", "xml"): 8.0,
+    ("json", "ndjson"): 8.0,
+    ("csv", "json"): 6.0,
+    ("csv", "ndjson"): 6.0,
+}
+_STREAMING_MEMORY = 16 << 20
+
+# Assumed ratio of a compressed input's decompressed size to its size on disk
+_COMPRESSION_RATIO = 5
+
+
+def _json_is_array(input_file):
+    """Whether a JSON file's document is an array (of rows), judged from its first characters"""
+    try:
+        with _open_input(input_file, "json") as f:
+            return f.read(4096).lstrip("\ufeff \t\r\n").startswith("[")
+    except (OSError, ValueError, EOFError):
+        return False
+
+
+def estimate_memory(input_file, output_format, typed=False, size=None):
+    """Rough peak memory, in bytes, of converting input_file to output_format"""
+    input_format, compression = split_format(input_file)[1:]
+    if size is None:
+        size = os.path.getsize(input_file)
+    if compression is not None:
+        size *= _COMPRESSION_RATIO
+    formats = [output_format] if isinstance(output_format, str) else output_format
+    expansion = max((_MEMORY_EXPANSION.get((input_format, fmt.lower()), 0.0) for fmt in formats), default=0.0)
+    if expansion and (input_format == "csv" and not typed or input_format == "json" and _json_is_array(input_file)):
+        expansion = 0.0
+    return int(_STREAMING_MEMORY + expansion * size)
+
+
+class _MemoryBudget:
+    """Estimated peak memory of the admitted conversions, held against a limit in bytes"""
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.reserved = 0
+        self.running = 0
+
+    @property
+    def free(self):
+        return float("inf") if self.limit is None else self.limit - self.reserved
+
+    def fits(self, estimate):
+        return estimate <= self.free or not self.running
+
+    def reserve(self, estimate):
+        self.reserved += estimate
+        self.running += 1
+
+    def release(self, estimate):
+        self.reserved -= estimate
+        self.running -= 1
+
+
+def make_executor(backend="thread", max_workers=None):
+    """Create the thread or process executor for a batch run"""
+    import concurrent.futures
+
+    try:
+        executor_class = getattr(concurrent.futures, _BACKENDS[backend])
+    except KeyError:
+        raise ValueError(f"Unknown execution backend: {backend!r}") from None
+    return executor_class(max_workers=max_workers)
+
+
+_MANIFEST_NAME = ".batchprocessor-manifest"
+
+
+def _walk_inputs(folder_path, recursive=False, include=None, exclude=None, ignore=()):
+    """Yield (path, stat) for each input under folder_path; see find_inputs"""
+    ignore = {os.path.abspath(directory) for directory in ignore}
+    pending = [(folder_path, "")]
+    while pending:
+        directory, prefix = pending.pop()
+        try:
+            entries = os.scandir(directory)
+        except FileNotFoundError:
+            if directory is folder_path:
+                raise
+            continue
+        with entries:
+            for entry in entries:
+                relative = prefix + entry.name
+                if exclude and any(fnmatch.fnmatch(relative, pattern) for pattern in exclude):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive and os.path.abspath(entry.path) not in ignore:
+                        pending.append((entry.path, relative + "/"))
+                elif (entry.is_file() and split_format(entry.name)[1] in _FORMATS
+                      and (not include or any(fnmatch.fnmatch(relative, pattern) for pattern in include))):
+                    try:
+                        yield entry.path, entry.stat()
+                    except FileNotFoundError:
+                        pass
+
+
+def find_inputs(folder_path, recursive=False, include=None, exclude=None, ignore=()):
+    """Find the convertible files under folder_path in one os.scandir walk, as (path, size) pairs"""
+    return [(path, stat.st_size) for path, stat in _walk_inputs(folder_path, recursive, include, exclude, ignore)]
+
+
+def _file_digest(path):
+    """SHA-256 of a file's content, read in large blocks"""
+    import hashlib
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(_BUFFER_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _fingerprint_and_convert(input_file, output_format, compact=False, typed=False, output_dir=None,
+                             compression=None, compression_level=None):
+    """Convert one file and return its ConversionResult with the input's fingerprint"""
+    start = time.perf_counter()
+    try:
+        stat = os.stat(input_file)
+        fingerprint = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": _file_digest(input_file)}
+    except OSError as e:
+        return ConversionResult(input_file, output_format, error=str(e)), None
+    hashing = time.perf_counter() - start
+    result = convert_file(input_file, output_format, compact, typed=typed, output_dir=output_dir,
+                          compression=compression, compression_level=compression_level)
+    result.stages["fingerprint"] = hashing
+    result.seconds += hashing
+    return result, fingerprint
+
+
+class ConversionManifest:
+    """Sidecar record of converted inputs, used to skip unchanged files"""
+
+    def __init__(self, path):
+        self.path = path
+        self._base = os.path.dirname(os.path.abspath(path))
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f).get("files", {})
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def _key(self, path):
+        return os.path.relpath(os.path.abspath(path), self._base)
+
+    def current_output(self, input_file, target, output_dir=None):
+        """Return the recorded output if it is still valid for input_file, else None"""
+        entry = self._entries.get(self._key(input_file))
+        if entry is None or entry["target"] != target or "outputs" not in entry:
+            return None
+
+        output_files = [os.path.normpath(os.path.join(self._base, output)) for output in entry["outputs"]]
+        try:
+            if [os.path.getsize(output_file) for output_file in output_files] != entry["output_sizes"]:
+                return None
+            stat = os.stat(input_file)
+        except OSError:
+            return None
+
+        if stat.st_size != entry["size"]:
+            return None
+        if stat.st_mtime_ns != entry["mtime_ns"]:
+            if _file_digest(input_file) != entry["sha256"]:
+                return None
+            entry["mtime_ns"] = stat.st_mtime_ns
+        directory = os.path.dirname(input_file) if output_dir is None else output_dir
+        output_files = [os.path.join(directory, os.path.basename(output_file))
+                        if os.path.dirname(output_file) == os.path.abspath(directory) else output_file
+                        for output_file in output_files]
+        return output_files if isinstance(target["output_format"], list) else output_files[0]
+
+    def record(self, input_file, fingerprint, target, output):
+        """Remember the fingerprint and output path (or list of paths) of a conversion"""
+        output_files = [output] if isinstance(output, str) else output
+        self._entries[self._key(input_file)] = dict(
+            fingerprint,
+            target=target,
+            outputs=[self._key(output_file) for output_file in output_files],
+            output_sizes=[os.path.getsize(output_file) for output_file in output_files],
+        )
+
+    def outputs(self):
+        """Paths recorded as outputs of other inputs"""
+        outputs = set()
+        for key, entry in self._entries.items():
+            outputs.update(os.path.join(self._base, output) for output in entry.get("outputs", ()) if output != key)
+        return outputs
+
+    def save(self):
+        """Write the manifest atomically next to the files it describes"""
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": 1, "files": self._entries}, f, indent=1, sort_keys=True)
+        os.replace(temp_path, self.path)
+
+
+def _exclude_outputs(files, formats, conversion_manifest=None, siblings=True, compression=None):
+    """Drop files that the batch itself writes, so no file is read while being rewritten"""
+    outputs = set()
+    for file in files if siblings else ():
+        base, file_format, file_compression = split_format(file)
+        output_compression = _output_compression(file, compression)
+        outputs.update(os.path.abspath(_output_path(base, fmt, output_compression)) for fmt in formats
+                       if (fmt, output_compression) != (file_format, file_compression))
+    if conversion_manifest is not None:
+        outputs.update(os.path.abspath(output) for output in conversion_manifest.outputs())
+    return [file for file in files if os.path.abspath(file) not in outputs]
+
+
+def _output_formats(output_format):
+    """Lower-cased list of a batch's output formats, checked before any file is converted"""
+    formats = [output_format.lower()] if isinstance(output_format, str) else [fmt.lower() for fmt in output_format]
+    for fmt in formats:
+        if fmt not in _FORMATS:
+            raise ValueError(f"Unsupported output format: {fmt}")
+    return formats
+
+
+def _mirrored_dir(file, folder_path, output_dir):
+    """Directory for file's outputs: beside it, or its place in output_dir's mirror of folder_path"""
+    if output_dir is None:
+        return None
+    return os.path.normpath(os.path.join(output_dir, os.path.relpath(os.path.dirname(file), folder_path)))
+
+
+def _output_key(file, output_dir, compression, compression_level=None):
+    """Output stem and compression of file; inputs with the same key would write the same outputs"""
+    stem = os.path.basename(split_format(file)[0])
+    return (os.path.normcase(os.path.abspath(os.path.join(output_dir or os.path.dirname(file), stem))),
+            _output_compression(file, compression, compression_level))
+
+
+def _remove_partial_outputs(file, formats, output_dir, compression, compression_level=None):
+    """Delete the partial outputs of file left behind by a worker process that died writing them"""
+    stem, output_compression = _output_key(file, output_dir, compression, compression_level)
+    for fmt in formats:
+        try:
+            os.remove(_output_path(stem, fmt, output_compression) + _PARTIAL_SUFFIX)
+        except OSError:
+            pass
+
+
+def _manifest_target(output_format, compact, typed, output_dir, compression, compression_level):
+    """The target a ConversionManifest records for a batch's options"""
+    target = {"output_format": (output_format.lower() if isinstance(output_format, str)
+                                else [fmt.lower() for fmt in output_format]),
+              "compact": compact, "typed": typed, "converter_version": CONVERTER_VERSION}
+    if compression is not None or compression_level is not None:
+        target["compression"] = [compression, compression_level]
+    if output_dir is not None:
+        target["output_dir"] = os.path.abspath(output_dir)
+    return target
+
+
+def _manifest_path(folder_path, manifest):
+    """Path of a batch's manifest: the folder's default one for manifest=True, else manifest itself"""
+    return os.path.join(folder_path, _MANIFEST_NAME) if manifest is True else manifest
+
+
+def _in_flight_limit(backend, max_workers):
+    """How many jobs a batch keeps submitted at once on max_workers (the backend's default if None)"""
+    if max_workers is None:
+        # The defaults of ThreadPoolExecutor and ProcessPoolExecutor
+        cpus = os.cpu_count() or 1
+        if backend == "thread":
+            max_workers = min(32, cpus + 4)
+        else:
+            max_workers = min(cpus, 61) if sys.platform == "win32" else cpus
+    return _IN_FLIGHT_PER_WORKER * max_workers
+
+
+def _submit_conversion(executor, file, output_format, compact, typed, output_dir, compression,
+                       compression_level, fingerprint):
+    """Submit one input's conversion, returning with its fingerprint when fingerprint is true"""
+    if fingerprint:
+        return executor.submit(_fingerprint_and_convert, file, output_format, compact, typed,
+                               output_dir, compression, compression_level)
+    return executor.submit(convert_file, file, output_format, compact, typed=typed, output_dir=output_dir,
+                           compression=compression, compression_level=compression_level)
+
+
+class BatchResult(list):
+    """Output paths of a batch run, with a ConversionResult record per input"""
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.converted = 0
+        self.skipped = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.seconds = 0.0
+
+    def add(self, record):
+        """Record the result of one input"""
+        self.records.append(record)
+        if record.error is not None:
+            self.failed += 1
+            return
+        self.extend(record.outputs)
+        if record.skipped:
+            self.skipped += 1
+        else:
+            self.converted += 1
+
+    @property
+    def errors(self):
+        return [record for record in self.records if record.error is not None]
+
+    def summary(self):
+        """Batch totals: counts, bytes, rows, time per stage and throughput"""
+        converted = [record for record in self.records if not record.skipped and record.error is None]
+        stages = {}
+        for record in self.records:
+            for stage, seconds in record.stages.items():
+                stages[stage] = stages.get(stage, 0.0) + seconds
+        bytes_in = sum(record.bytes_in for record in converted)
+        return {
+            "files": len(self.records),
+            "converted": self.converted,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "bytes_in": bytes_in,
+            "bytes_out": sum(record.bytes_out for record in converted),
+            "rows": sum(record.rows for record in converted),
+            "seconds": self.seconds,
+            "stages": stages,
+            "files_per_second": len(converted) / self.seconds if self.seconds else 0.0,
+            "bytes_per_second": bytes_in / self.seconds if self.seconds else 0.0,
+        }
+
+
+def batch_process(folder_path, output_format, compact=False, backend="thread", max_workers=None,
+                  manifest=None, typed=False, on_result=None, on_start=None, cancel=None,
+                  recursive=False, include=None, exclude=None, output_dir=None, compression=None,
+                  compression_level=None, memory_budget=None):
+    """Convert every input in folder_path concurrently and return a BatchResult"""
+    from concurrent.futures import wait, FIRST_COMPLETED, BrokenExecutor
+
+    start = time.perf_counter()
+    formats = _output_formats(output_format)
+    ignore = () if output_dir is None else (output_dir,)
+    sizes = dict(find_inputs(folder_path, recursive, include, exclude, ignore))
+    files = list(sizes)
 
     if not files:
         raise ValueError("No compatible files found in the folder.")
 
-    results = []
-    with ThreadPoolExecutor() as executor:
+    _check_compression(compression, compression_level)
+    results = BatchResult()
+    conversion_manifest = None
+    if manifest:
+        manifest_path = _manifest_path(folder_path, manifest)
+        conversion_manifest = ConversionManifest(manifest_path)
+        files = [file for file in files if os.path.abspath(file) != os.path.abspath(manifest_path)]
+    files = _exclude_outputs(files, formats, conversion_manifest, siblings=output_dir is None,
+                             compression=compression)
+    if on_start is not None:
+        on_start(len(files))
+
+    def mirrored_dir(file):
+        return _mirrored_dir(file, folder_path, output_dir)
+
+    # Inputs that share a stem in one directory (a.csv and a.json) would write the
+    # same outputs concurrently; the first one by path converts, the others fail.
+    claimed = {}
+    for file in sorted(files):
+        try:
+            key = _output_key(file, mirrored_dir(file), compression, compression_level)
+        except ValueError as e:
+            # Such as a compression level that this input's own codec rejects
+            key, error = None, str(e)
+        else:
+            error = f"Outputs would overwrite those of {claimed[key]}" if key in claimed else None
+        if error is not None:
+            record = ConversionResult(file, output_format, error=error)
+            results.add(record)
+            if on_result is not None:
+                on_result(record)
+        else:
+            claimed[key] = file
+    files = list(claimed.values())
+
+    if conversion_manifest is not None:
+        target = _manifest_target(output_format, compact, typed, output_dir, compression, compression_level)
+        pending = []
         for file in files:
-            results.append(executor.submit(process_conversion, file, output_format))
+            output_file = conversion_manifest.current_output(file, target, mirrored_dir(file))
+            if output_file is None:
+                pending.append(file)
+            else:
+                record = ConversionResult(file, output_format, output_file, skipped=True)
+                results.add(record)
+                if on_result is not None:
+                    on_result(record)
+        files = pending
+
+    # Pending inputs in ascending order of estimated memory (of size without a
+    # budget), so the biggest one that fits is found by bisection and taken first
+    memory = _MemoryBudget(memory_budget)
+    if memory_budget is None:
+        weights = sizes
+    else:
+        weights = {file: estimate_memory(file, formats, typed, sizes[file]) for file in files}
+    files.sort(key=weights.__getitem__)
+    pending_weights = [weights[file] for file in files]
+    in_flight = _in_flight_limit(backend, max_workers)
+
+    executor = make_executor(backend, max_workers)
+    futures = {}
+    try:
+        while True:
+            if cancel is not None and cancel.is_set():
+                results.cancelled += len(files)
+                files.clear()
+                pending_weights.clear()
+                for future in list(futures):
+                    if future.cancel():
+                        memory.release(futures.pop(future)[1])
+                        results.cancelled += 1
+            while files and len(futures) < in_flight:
+                index = bisect.bisect_right(pending_weights, memory.free) - 1
+                if index < 0:
+                    if memory.running:
+                        break
+                    index = 0
+                file = files.pop(index)
+                weight = pending_weights.pop(index)
+                future = _submit_conversion(executor, file, output_format, compact, typed,
+                                            mirrored_dir(file), compression, compression_level,
+                                            fingerprint=conversion_manifest is not None)
+                futures[future] = (file, weight, executor)
+                memory.reserve(weight)
+            if not futures:
+                break
+
+            done, _ = wait(futures, timeout=None if cancel is None else _CANCEL_POLL,
+                           return_when=FIRST_COMPLETED)
+            for future in done:
+                file, weight, future_executor = futures.pop(future)
+                memory.release(weight)
+                try:
+                    record = future.result()
+                except BrokenExecutor as e:
+                    # A worker process died (killed or out of memory); start a fresh pool for later files
+                    record = ConversionResult(file, output_format, error=str(e) or type(e).__name__)
+                    _remove_partial_outputs(file, formats, mirrored_dir(file), compression, compression_level)
+                    if future_executor is executor:
+                        executor.shutdown(wait=False)
+                        executor = make_executor(backend, max_workers)
+                else:
+                    if conversion_manifest is not None:
+                        record, fingerprint = record
+                        if record.ok:
+                            conversion_manifest.record(file, fingerprint, target, record.output)
+                results.add(record)
+                if on_result is not None:
+                    on_result(record)
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        raise
+    finally:
+        executor.shutdown(wait=True)
+        if conversion_manifest is not None:
+            conversion_manifest.save()
+
+    results.seconds = time.perf_counter() - start
+    return results
+
+
+# ------------------------------
+# Background Jobs
+# ------------------------------
+
+class ConversionJob:
+    """Convert a file or folder on a background thread, reporting through a queue"""
+
+    def __init__(self, path, output_format, **options):
+        self.path = path
+        self.output_format = output_format
+        self.options = options
+        self.events = queue.Queue()
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def _run(self):
+        put = self.events.put
+        try:
+            if os.path.isdir(self.path):
+                results = batch_process(self.path, self.output_format,
+                                        on_result=lambda record: put(("result", record)),
+                                        on_start=lambda total: put(("start", total)),
+                                        cancel=self._cancel, **self.options)
+            else:
+                put(("start", 1))
+                record = convert_file(self.path, self.output_format, **self.options)
+                results = BatchResult()
+                results.add(record)
+                results.seconds = record.seconds
+                put(("result", record))
+        except Exception as e:
+            put(("error", str(e)))
+        else:
+            put(("done", results))
+
 
-    return [res.result() for res in results if res.result() is not None]
+if __name__ == "__main__":
+    from cli import main
+    sys.exit(main())
@@ -0,0 +1,309 @@
+"""Conversion benchmarks for batchprocessor.
+
+Scaled-up inputs are generated from SampleData, every conversion function
+plus batch_process is timed on each scale, and rows/sec, MB/sec and peak
+memory are recorded. Results can be saved as JSON and compared against a
+stored baseline to catch performance regressions:
+
+    python benchmark.py --scales 1 10 100 --output results.json
+    python benchmark.py --save-baseline benchmark_baseline.json
+    python benchmark.py --baseline benchmark_baseline.json --tolerance 0.2
+
+CSVDataSample.csv is repeated N times to build the CSV input, and the
+row-shaped JSON, XML and NDJSON inputs are converted from it. XMLDataSample.xml's
+records are repeated 1000*N times for the element-tree XML input, and
+the tree JSON input is converted from that. JSONDataSample.json is a
+free-form document, so it is repeated 1000*N times as a top-level array;
+json_to_ndjson on it measures the incremental JSON reader on nested objects.
+
+Every case runs in a freshly spawned process so peak RSS belongs to that
+case alone; tracemalloc peaks come from a separate run so that tracing
+does not distort the timings.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+
+import batchprocessor
+
+try:
+    import resource
+except ImportError:  # Windows has no getrusage; peak RSS is then not reported
+    resource = None
+
+SAMPLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "SampleData")
+
+# (name, function, input key, output extension)
+CASES = [
+    ("csv_to_json", "csv_to_json", "csv", "json"),
+    ("csv_to_xml", "csv_to_xml", "csv", "xml"),
+    ("csv_to_ndjson", "csv_to_ndjson", "csv", "ndjson"),
+    ("json_to_csv", "json_to_csv", "rows_json", "csv"),
+    ("json_to_xml", "json_to_xml", "rows_json", "xml"),
+    ("xml_to_csv", "xml_to_csv", "rows_xml", "csv"),
+    ("ndjson_to_csv", "ndjson_to_csv", "rows_ndjson", "csv"),
+    ("xml_to_json", "xml_to_json", "tree_xml", "json"),
+    ("json_to_xml_tree", "json_to_xml", "tree_json", "xml"),
+    ("json_to_ndjson_nested", "json_to_ndjson", "nested_json", "ndjson"),
+    ("batch_process_thread", "batch_process", "batch", "xml"),
+    ("batch_process_process", "batch_process", "batch", "xml"),
+]
+
+BATCH_COPIES = 4
+
+# The XML and JSON samples are tiny, so they are repeated this many more times per scale
+SMALL_SAMPLE_REPEAT = 1000
+
+
+# ------------------------------
+# Input Generation
+# ------------------------------
+
+def _generate_csv(path, scale):
+    with open(os.path.join(SAMPLE_DIR, "CSVDataSample.csv"), "r", encoding="utf-8", newline="") as f:
+        header = f.readline()
+        body = f.read()
+    if not body.endswith("\n"):
+        body += "\n"
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(header)
+        for _ in range(scale):
+            f.write(body)
+    return 1 + scale * body.count("\n")
+
+
+def _generate_tree_xml(path, repeat):
+    root = ET.parse(os.path.join(SAMPLE_DIR, "XMLDataSample.xml")).getroot()
+    records = "".join(ET.tostring(record, encoding="unicode") for record in root)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"<?xml version='1.0' encoding='utf-8'?>\n<{root.tag}>{root.text or ''}")
+        for _ in range(repeat):
+            f.write(records)
+        f.write(f"</{root.tag}>")
+    return 1 + repeat * (sum(1 for _ in root.iter()) - 1)
+
+
+def _generate_nested_json(path, repeat):
+    with open(os.path.join(SAMPLE_DIR, "JSONDataSample.json"), "r", encoding="utf-8") as f:
+        document = json.dumps(json.load(f), indent=4)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[\n")
+        f.write(",\n".join(document for _ in range(repeat)))
+        f.write("\n]")
+    return repeat
+
+
+def generate_inputs(work_dir, scale):
+    """Write the scaled inputs for one scale and return {key: (path, rows)}"""
+    scale_dir = os.path.join(work_dir, f"x{scale}")
+    os.makedirs(scale_dir, exist_ok=True)
+    inputs = {}
+
+    csv_path = os.path.join(scale_dir, "rows.csv")
+    rows = _generate_csv(csv_path, scale)
+    inputs["csv"] = (csv_path, rows)
+
+    rows_json = os.path.join(scale_dir, "rows.json")
+    batchprocessor.csv_to_json(csv_path, rows_json)
+    inputs["rows_json"] = (rows_json, rows)
+
+    rows_xml = os.path.join(scale_dir, "rows.xml")
+    batchprocessor.csv_to_xml(csv_path, rows_xml)
+    inputs["rows_xml"] = (rows_xml, rows)
+
+    rows_ndjson = os.path.join(scale_dir, "rows.ndjson")
+    batchprocessor.csv_to_ndjson(csv_path, rows_ndjson)
+    inputs["rows_ndjson"] = (rows_ndjson, rows)
+
+    tree_xml = os.path.join(scale_dir, "tree.xml")
+    elements = _generate_tree_xml(tree_xml, scale * SMALL_SAMPLE_REPEAT)
+    inputs["tree_xml"] = (tree_xml, elements)
+
+    tree_json = os.path.join(scale_dir, "tree.json")
+    batchprocessor.xml_to_json(tree_xml, tree_json)
+    inputs["tree_json"] = (tree_json, elements)
+
+    nested_json = os.path.join(scale_dir, "nested.json")
+    inputs["nested_json"] = (nested_json, _generate_nested_json(nested_json, scale * SMALL_SAMPLE_REPEAT))
+
+    batch_dir = os.path.join(scale_dir, "batch")
+    os.makedirs(batch_dir, exist_ok=True)
+    for copy in range(BATCH_COPIES):
+        shutil.copy(csv_path, os.path.join(batch_dir, f"rows{copy}.csv"))
+    inputs["batch"] = (batch_dir, rows * BATCH_COPIES)
+    return inputs
+
+
+def _input_bytes(path):
+    if os.path.isdir(path):
+        return sum(entry.stat().st_size for entry in os.scandir(path) if entry.name.endswith(".csv"))
+    return os.path.getsize(path)
+
+
+# ------------------------------
+# Measurement
+# ------------------------------
+
+def _peak_rss_bytes():
+    """Peak resident set size of this process, from VmHWM where available"""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, other Unixes kilobytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _run_case(function_name, input_path, output_path, case_name, trace):
+    """Run one conversion in this (fresh) process and measure it"""
+    import tracemalloc
+
+    if function_name == "batch_process":
+        backend = "process" if case_name.endswith("process") else "thread"
+        for name in os.listdir(input_path):
+            if name.endswith(".xml"):
+                os.remove(os.path.join(input_path, name))
+        call = lambda: batchprocessor.batch_process(input_path, "xml", backend=backend)
+    else:
+        function = getattr(batchprocessor, function_name)
+        call = lambda: function(input_path, output_path)
+
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = call()
+    seconds = time.perf_counter() - start
+    if getattr(result, "failed", 0):
+        raise RuntimeError(f"{case_name}: {result.errors[0].error}")
+    traced_peak = tracemalloc.get_traced_memory()[1] if trace else None
+    if trace:
+        tracemalloc.stop()
+    return {"seconds": seconds, "peak_rss_bytes": _peak_rss_bytes(), "tracemalloc_peak_bytes": traced_peak}
+
+
+def _in_fresh_process(*args):
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+        return executor.submit(_run_case, *args).result()
+
+
+def run_benchmarks(scales, work_dir, repeat=1, trace=True, cases=None):
+    """Run every case on every scale and return a list of result records"""
+    results = []
+    for scale in scales:
+        inputs = generate_inputs(work_dir, scale)
+        for name, function_name, input_key, output_ext in CASES:
+            if cases and name not in cases:
+                continue
+            input_path, rows = inputs[input_key]
+            output_path = os.path.join(work_dir, f"x{scale}", f"out_{name}.{output_ext}")
+            size = _input_bytes(input_path)
+
+            runs = [_in_fresh_process(function_name, input_path, output_path, name, False) for _ in range(repeat)]
+            best = min(runs, key=lambda run: run["seconds"])
+            traced = _in_fresh_process(function_name, input_path, output_path, name, True) if trace else {}
+
+            record = {
+                "case": name,
+                "scale": scale,
+                "rows": rows,
+                "input_bytes": size,
+                "seconds": round(best["seconds"], 6),
+                "rows_per_sec": round(rows / best["seconds"], 1),
+                "mb_per_sec": round(size / 1e6 / best["seconds"], 3),
+                "peak_rss_bytes": max((run["peak_rss_bytes"] or 0) for run in runs) or None,
+                "tracemalloc_peak_bytes": traced.get("tracemalloc_peak_bytes"),
+            }
+            results.append(record)
+            print(f"{name:24} x{scale:<5} {record['seconds']:9.3f}s {record['rows_per_sec']:12.0f} rows/s "
+                  f"{record['mb_per_sec']:8.2f} MB/s  rss {_megabytes(record['peak_rss_bytes'])}  "
+                  f"traced {_megabytes(record['tracemalloc_peak_bytes'])}", flush=True)
+    return results
+
+
+def _megabytes(value):
+    return "n/a" if value is None else f"{value / 1e6:.1f} MB"
+
+
+# ------------------------------
+# Baseline Comparison
+# ------------------------------
+
+def compare(results, baseline, tolerance):
+    """Return descriptions of cases slower or hungrier than the baseline by more than tolerance"""
+    previous = {(record["case"], record["scale"]): record for record in baseline["results"]}
+    regressions = []
+    for record in results:
+        base = previous.get((record["case"], record["scale"]))
+        if base is None:
+            continue
+        label = f"{record['case']} x{record['scale']}"
+        if record["rows_per_sec"] < base["rows_per_sec"] * (1 - tolerance):
+            regressions.append(f"{label}: {record['rows_per_sec']:.0f} rows/s, baseline {base['rows_per_sec']:.0f}")
+        for key in ("peak_rss_bytes", "tracemalloc_peak_bytes"):
+            if record.get(key) and base.get(key) and record[key] > base[key] * (1 + tolerance):
+                regressions.append(f"{label}: {key} {_megabytes(record[key])}, baseline {_megabytes(base[key])}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the batchprocessor conversions.")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100],
+                        help="input sizes as multiples of the sample data (default: 1 10 100)")
+    parser.add_argument("--cases", nargs="+", choices=[case[0] for case in CASES], help="only run these cases")
+    parser.add_argument("--repeat", type=int, default=1, help="timed runs per case; the fastest is kept")
+    parser.add_argument("--no-tracemalloc", dest="trace", action="store_false",
+                        help="skip the extra traced run that measures Python allocation peaks")
+    parser.add_argument("--work-dir", help="where to generate inputs (default: a temporary folder)")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against results saved with --save-baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed fractional slowdown or memory growth (default: 0.2)")
+    parser.add_argument("--save-baseline", help="store these results as the new baseline")
+    args = parser.parse_args(argv)
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="batchprocessor-bench-")
+    try:
+        results = run_benchmarks(args.scales, work_dir, args.repeat, args.trace, args.cases)
+    finally:
+        if args.work_dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "converter_version": batchprocessor.CONVERTER_VERSION,
+        "python": sys.version.split()[0],
+        "platform": sys.platform,
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=4)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+        print("No regressions against the baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
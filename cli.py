@@ -0,0 +1,182 @@
+import os
+import re
+import sys
+import json
+from contextlib import ExitStack
+from batchprocessor import (
+    batch_process, convert_file, convert_stream, _BACKENDS, _COMPRESSIONS, _FORMATS, _check_compression,
+    _open_input, _open_output,
+)
+from watch import FolderWatcher, DEFAULT_INTERVAL, DEFAULT_SETTLE
+
+
+def main(argv=None):
+    """Headless entry point: python -m batchprocessor PATH... --to FORMAT"""
+    import argparse
+
+    def row_range(text):
+        start, colon, stop = text.partition(":")
+        if not colon:
+            raise ValueError(text)
+        return int(start or 0), int(stop) if stop else None
+
+    def byte_size(text):
+        match = re.fullmatch(r"(\d+(?:\.\d+)?)\s*([KMGT]?)B?", text.strip(), re.IGNORECASE)
+        if match is None:
+            raise ValueError(text)
+        number, unit = match.groups()
+        return int(float(number) * 1024 ** " KMGT".index(unit.upper() or " "))
+
+    parser = argparse.ArgumentParser(
+        prog="python -m batchprocessor",
+        description="Convert files between CSV, JSON, XML and NDJSON without the GUI.",
+        epilog="Folders are converted largest file first, a few files per worker at a time; a file that fails "
+               "is reported without stopping the others. Files a run writes are never read as inputs, and "
+               "inputs that would write the same outputs (a.csv and a.xml --to json) are reported as failed.",
+    )
+    parser.add_argument("paths", nargs="+", metavar="PATH",
+                        help="input file or folder, or - to convert stdin to stdout")
+    parser.add_argument("-t", "--to", dest="formats", action="append", required=True,
+                        type=str.lower, choices=_FORMATS,
+                        help="output format; repeat to write several formats from one parse")
+    parser.add_argument("-f", "--from", dest="input_format", type=str.lower, choices=_FORMATS,
+                        help="input format when reading stdin")
+    parser.add_argument("--compact", action="store_true", help="write JSON without indentation")
+    parser.add_argument("--typed", action="store_true",
+                        help="infer CSV column types and write numbers as JSON numbers")
+    parser.add_argument("--parallel", action="store_true",
+                        help="split large CSV and NDJSON files into chunks converted by several processes")
+    parser.add_argument("--backend", choices=sorted(_BACKENDS), default="thread",
+                        help="executor used for folders (default: thread)")
+    parser.add_argument("-j", "--workers", type=int, help="number of worker threads or processes")
+    parser.add_argument("--manifest", action="store_true",
+                        help="skip folder inputs that are unchanged since the last run")
+    parser.add_argument("-r", "--recursive", action="store_true", help="also convert files in subfolders")
+    parser.add_argument("--include", action="append", metavar="GLOB",
+                        help="only convert folder inputs whose relative path matches; repeatable")
+    parser.add_argument("--exclude", action="append", metavar="GLOB",
+                        help="skip folder inputs and subfolders whose relative path matches; repeatable")
+    parser.add_argument("-o", "--output-dir", metavar="DIR",
+                        help="write outputs here (mirroring a folder's tree) instead of beside the inputs")
+    parser.add_argument("-z", "--compress", choices=(*_COMPRESSIONS, "none"),
+                        help="compress outputs with gzip, bzip2 or xz, or not at all "
+                             "(default: like each input; .gz, .bz2 and .xz inputs are always read)")
+    parser.add_argument("--compress-level", type=int, choices=range(10), metavar="0-9",
+                        help="compression level: higher writes fewer bytes for more CPU; bz2 takes 1-9 "
+                             "(default: the codec's)")
+    parser.add_argument("--rows", type=row_range, metavar="START:STOP",
+                        help="convert only rows START to STOP-1 of a file (row 0 is the first line); "
+                             "CSV files are indexed once so later ranges start instantly")
+    parser.add_argument("--memory-budget", type=byte_size, metavar="SIZE",
+                        help="for folders, only run conversions at once while their estimated peak memory "
+                             "fits in SIZE (such as 4G or 512M); big files wait while small ones go ahead")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep watching a folder and convert files as they arrive, until Ctrl-C")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL, metavar="SECONDS",
+                        help=f"with --watch, seconds between scans of the folder (default: {DEFAULT_INTERVAL:g})")
+    parser.add_argument("--settle", type=float, default=DEFAULT_SETTLE, metavar="SECONDS",
+                        help="with --watch, how long a file must stay unchanged before it is converted "
+                             f"(default: {DEFAULT_SETTLE:g})")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="write a JSON line per converted file, and a summary per folder, to FILE")
+    args = parser.parse_args(argv)
+    if args.rows is not None and any(path == "-" or os.path.isdir(path) for path in args.paths):
+        parser.error("--rows only applies to input files")
+    try:
+        _check_compression(args.compress, args.compress_level)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.watch and (len(args.paths) > 1 or not os.path.isdir(args.paths[0])):
+        parser.error("--watch needs a single folder")
+
+    if "-" in args.paths:
+        if len(args.paths) > 1 or len(args.formats) > 1 or args.input_format is None:
+            parser.error("- must be the only path, with --from and a single --to format")
+        sys.stdout.flush()
+        try:
+            with _open_input(sys.stdin.fileno(), args.input_format, closefd=False) as input_stream, \
+                    _open_output(sys.stdout.fileno(), args.formats[0], closefd=False) as output_stream:
+                convert_stream(input_stream, output_stream, args.input_format, args.formats[0],
+                               compact=args.compact, typed=args.typed)
+        except Exception as e:
+            print(f"{parser.prog}: -: Error converting {args.input_format.upper()} to "
+                  f"{args.formats[0].upper()}: {e}", file=sys.stderr)
+            return 1
+        return 0
+
+    output_format = args.formats[0] if len(args.formats) == 1 else args.formats
+    with ExitStack() as stack:
+        metrics_file = None
+        if args.metrics:
+            metrics_file = stack.enter_context(open(args.metrics, 'w', encoding='utf-8'))
+
+        def write_metrics(record):
+            if metrics_file is not None:
+                metrics_file.write(json.dumps(record) + "\n")
+
+        if args.watch:
+            def report(record):
+                write_metrics(record.as_dict())
+                if metrics_file is not None:
+                    metrics_file.flush()
+                if record.error is not None:
+                    print(f"{parser.prog}: {record.input_file}: {record.error}", file=sys.stderr)
+                for output in record.outputs:
+                    print(output, flush=True)
+
+            path = args.paths[0]
+            try:
+                watcher = FolderWatcher(path, output_format, compact=args.compact, backend=args.backend,
+                                        max_workers=args.workers, manifest=args.manifest, typed=args.typed,
+                                        on_result=report, recursive=args.recursive, include=args.include,
+                                        exclude=args.exclude, output_dir=args.output_dir,
+                                        compression=args.compress, compression_level=args.compress_level,
+                                        interval=args.interval, settle=args.settle,
+                                        memory_budget=args.memory_budget)
+            except ValueError as e:
+                print(f"{parser.prog}: {path}: {e}", file=sys.stderr)
+                return 1
+            print(f"Watching {path} (Ctrl-C to stop)", file=sys.stderr)
+            try:
+                watcher.run()
+            except KeyboardInterrupt:
+                pass
+            return 0
+
+        status = 0
+        for path in args.paths:
+            try:
+                if os.path.isdir(path):
+                    results = batch_process(path, output_format, compact=args.compact, backend=args.backend,
+                                            max_workers=args.workers, manifest=args.manifest, typed=args.typed,
+                                            on_result=lambda record: write_metrics(record.as_dict()),
+                                            recursive=args.recursive, include=args.include, exclude=args.exclude,
+                                            output_dir=args.output_dir, compression=args.compress,
+                                            compression_level=args.compress_level,
+                                            memory_budget=args.memory_budget)
+                    write_metrics({"folder": path, "summary": results.summary()})
+                    outputs = list(results)
+                    print(f"{path}: {results.converted} converted, {results.skipped} skipped, "
+                          f"{results.failed} failed", file=sys.stderr)
+                    for record in results.errors:
+                        print(f"{parser.prog}: {record.input_file}: {record.error}", file=sys.stderr)
+                        status = 1
+                else:
+                    record = convert_file(path, output_format, compact=args.compact, parallel=args.parallel,
+                                          max_workers=args.workers, typed=args.typed, output_dir=args.output_dir,
+                                          compression=args.compress, compression_level=args.compress_level,
+                                          row_range=args.rows)
+                    write_metrics(record.as_dict())
+                    if record.error is not None:
+                        raise RuntimeError(record.error)
+                    outputs = record.outputs
+                for output in outputs:
+                    print(output)
+            except (OSError, ValueError, RuntimeError) as e:
+                print(f"{parser.prog}: {path}: {e}", file=sys.stderr)
+                status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
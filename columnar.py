@@ -0,0 +1,189 @@
+import re
+import math
+from array import array
+
+# Only text that is already a valid JSON number is treated as numeric, so
+# values such as "1_000", " 7", "0x1F", "nan" or "inf" stay strings.
+_INT_PATTERN = re.compile(r"-?(?:0|[1-9][0-9]*)")
+_FLOAT_PATTERN = re.compile(r"-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?")
+
+_INT_MIN, _INT_MAX = -2 ** 63, 2 ** 63 - 1
+_EXACT_FLOAT_INT = 2 ** 53
+
+# Rows are rebuilt from the columns this many at a time
+_SLICE_ROWS = 4096
+
+
+def _render_float(value):
+    """Canonical text of a float cell; integral values render like ints"""
+    if value.is_integer() and abs(value) < _EXACT_FLOAT_INT:
+        return str(int(value))
+    return repr(value)
+
+
+class Column:
+    """One column of cells whose type is widened from null to int, float or string as values arrive"""
+
+    __slots__ = ("kind", "values", "nulls", "null_count", "originals", "length")
+
+    def __init__(self):
+        self.kind = "null"
+        self.values = None
+        self.nulls = None
+        self.null_count = 0
+        self.originals = {}
+        self.length = 0
+
+    def append(self, text):
+        kind = self.kind
+        if kind == "string":
+            self.values.append(text)
+        elif not text:
+            if kind != "null":
+                self.values.append(0)
+                self.nulls.append(1)
+            self.null_count += 1
+        elif kind != "float" and _INT_PATTERN.fullmatch(text) and _INT_MIN <= int(text) <= _INT_MAX:
+            if kind == "null":
+                self._become_numeric("q")
+            value = int(text)
+            self.values.append(value)
+            self.nulls.append(0)
+            if str(value) != text:
+                self.originals[self.length] = text
+        elif _FLOAT_PATTERN.fullmatch(text) and math.isfinite(float(text)):
+            if kind != "float":
+                self._become_numeric("d")
+            value = float(text)
+            self.values.append(value)
+            self.nulls.append(0)
+            if _render_float(value) != text:
+                self.originals[self.length] = text
+        else:
+            self._become_string()
+            self.values.append(text)
+        self.length += 1
+
+    def _become_numeric(self, typecode):
+        if self.kind == "null":
+            self.values = array(typecode, bytes(self.length * array(typecode).itemsize))
+            self.nulls = bytearray(b"\x01" * self.length)
+        else:
+            # int -> float: ints beyond 2**53 would be rounded, so remember their text
+            for index, value in enumerate(self.values):
+                if abs(value) >= _EXACT_FLOAT_INT and index not in self.originals:
+                    self.originals[index] = str(value)
+            self.values = array(typecode, self.values)
+        self.kind = "int" if typecode == "q" else "float"
+
+    def _become_string(self):
+        self.values = self._texts(0, self.length)
+        self.nulls = None
+        self.originals = {}
+        self.kind = "string"
+
+    def _originals_between(self, start, stop):
+        originals = self.originals
+        if len(originals) < stop - start:
+            return [(index, text) for index, text in originals.items() if start <= index < stop]
+        return [(index, originals[index]) for index in range(start, stop) if index in originals]
+
+    def _texts(self, start, stop):
+        """Original cell texts for rows start..stop"""
+        if self.kind == "null":
+            return [""] * (stop - start)
+        if self.kind == "string":
+            return self.values[start:stop]
+        render = str if self.kind == "int" else _render_float
+        texts = [render(value) for value in self.values[start:stop]]
+        self._patch(texts, start, stop, "")
+        for index, text in self._originals_between(start, stop):
+            texts[index - start] = text
+        return texts
+
+    def _patch(self, cells, start, stop, null_value):
+        if not self.null_count:
+            return
+        index = self.nulls.find(1, start, stop)
+        while index >= 0:
+            cells[index - start] = null_value
+            index = self.nulls.find(1, index + 1, stop)
+
+    def slice(self, start, stop, typed=True):
+        """Cells for rows start..stop: numbers and None when typed, else the original texts"""
+        if not typed:
+            return self._texts(start, stop)
+        if self.kind == "null":
+            return [None] * (stop - start)
+        if self.kind == "string":
+            return self.values[start:stop]
+        cells = self.values[start:stop].tolist()
+        if self.kind == "float":
+            # Cells written as integers stay integers; the others keep their float value
+            cells = [int(value) if value.is_integer() and abs(value) < _EXACT_FLOAT_INT else value
+                     for value in cells]
+            for index, text in self._originals_between(start, stop):
+                cells[index - start] = int(text) if _INT_PATTERN.fullmatch(text) else self.values[index]
+        self._patch(cells, start, stop, None)
+        return cells
+
+
+class ColumnarTable:
+    """Rows stored column by column with per-column type inference"""
+
+    def __init__(self, header=None):
+        self.header = header
+        self.columns = []
+        self._lengths = array("I")
+        self._ragged = False
+        self.row_count = 0
+
+    @classmethod
+    def from_rows(cls, rows, header=True):
+        """Build a table from an iterable of rows of strings"""
+        rows = iter(rows)
+        table = cls(next(rows, None) if header else None)
+        for row in rows:
+            table.append(row)
+        return table
+
+    def append(self, row):
+        width = len(row)
+        columns = self.columns
+        if width > len(columns):
+            for _ in range(width - len(columns)):
+                column = Column()
+                for _ in range(self.row_count):
+                    column.append("")
+                columns.append(column)
+            if self.row_count:
+                self._ragged = True
+        elif width < len(columns):
+            self._ragged = True
+            row = list(row) + [""] * (len(columns) - width)
+        for column, text in zip(columns, row):
+            column.append(text)
+        self._lengths.append(width)
+        self.row_count += 1
+
+    @property
+    def column_types(self):
+        return [column.kind for column in self.columns]
+
+    def iterrows(self, typed=True):
+        """Yield the header (if any) and then each row, typed or as original text"""
+        if self.header is not None:
+            yield self.header
+        for start in range(0, self.row_count, _SLICE_ROWS):
+            stop = min(start + _SLICE_ROWS, self.row_count)
+            cells = [column.slice(start, stop, typed) for column in self.columns]
+            if not cells:
+                for _ in range(start, stop):
+                    yield []
+                continue
+            if self._ragged:
+                for row, width in zip(zip(*cells), self._lengths[start:stop]):
+                    yield list(row[:width])
+            else:
+                for row in zip(*cells):
+                    yield list(row)
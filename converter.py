@@ -1,8 +1,61 @@
-import tkinter as tk
-from tkinter import filedialog, messagebox
-import csv
-import xml.etree.ElementTree as ET
-import json
+import os
+import queue
+import threading
+import batchprocessor
+
+# How often a progress window checks on its running conversion
+POLL_INTERVAL_MS = 100
+
+
+# ------------------------------
+# Background Conversion
+# ------------------------------
+def run_in_background(convert, input_path, output_path, success_message):
+    """Run convert(input_path, output_path) on a worker thread behind a progress window"""
+    import tkinter as tk
+    from tkinter import ttk, messagebox
+
+    metrics = batchprocessor.ConversionMetrics()
+    outcome = queue.Queue()
+    size = os.path.getsize(input_path)
+
+    window = tk.Toplevel()
+    window.title("Converting...")
+    ttk.Label(window, text=os.path.basename(input_path)).pack(padx=20, pady=5)
+    progress = ttk.Progressbar(window, orient="horizontal", length=300, mode="determinate", maximum=max(size, 1))
+    progress.pack(padx=20, pady=5)
+    status = ttk.Label(window, text="")
+    status.pack(padx=20, pady=5)
+
+    def work():
+        try:
+            convert(input_path, output_path, metrics=metrics)
+        except Exception as e:
+            outcome.put(e)
+        else:
+            outcome.put(None)
+
+    def poll():
+        progress["value"] = min(metrics.bytes_in, size)
+        status.config(text=f"{metrics.bytes_in / 1e6:.1f} of {size / 1e6:.1f} MB read, "
+                           f"{metrics.bytes_out / 1e6:.1f} MB written")
+        try:
+            error = outcome.get_nowait()
+        except queue.Empty:
+            window.after(POLL_INTERVAL_MS, poll)
+            return
+
+        window.destroy()
+        if error is None:
+            messagebox.showinfo("Success", success_message)
+        else:
+            # Don't leave a half-written file behind
+            if os.path.exists(output_path):
+                os.remove(output_path)
+            messagebox.showerror("Error", f"An error occurred:\n{error}")
+
+    threading.Thread(target=work, daemon=True).start()
+    window.after(POLL_INTERVAL_MS, poll)
 
 
 # ------------------------------
@@ -10,279 +63,145 @@ import json
 # ------------------------------
 def csv_to_xml():
     """Convert a CSV file to an XML file."""
+    from tkinter import filedialog
+
     # Ask the user to select a CSV file
     csv_path = filedialog.askopenfilename(
         title="Select CSV file",
-        filetypes=[("CSV Files", "*.csv")]
+        filetypes=[("CSV Files", "*.csv *.csv.gz *.csv.bz2 *.csv.xz")]
     )
     if csv_path:
-        try:
-            # Read the CSV as a list of lists
-            with open(csv_path, 'r', newline='', encoding='utf-8') as csv_file:
-                reader = csv.reader(csv_file)
-                data = list(reader)
-
-            # Ask the user where to save the XML file
-            xml_path = filedialog.asksaveasfilename(
-                defaultextension=".xml",
-                title="Save XML file",
-                filetypes=[("XML Files", "*.xml")]
-            )
-            if xml_path:
-                # Create an XML tree: <rows> with <row> and <cell> children
-                root = ET.Element("rows")
-                for row in data:
-                    row_elem = ET.SubElement(root, "row")
-                    for cell_value in row:
-                        cell_elem = ET.SubElement(row_elem, "cell")
-                        # cell_value might be None or empty; set text accordingly
-                        cell_elem.text = cell_value if cell_value is not None else ""
-
-                # Write the XML file with a declaration
-                tree = ET.ElementTree(root)
-                tree.write(xml_path, encoding="utf-8", xml_declaration=True)
-
-                messagebox.showinfo("Success", f"CSV successfully converted to XML:\n{xml_path}")
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred:\n{e}")
+        # Ask the user where to save the XML file
+        xml_path = filedialog.asksaveasfilename(
+            defaultextension=".xml",
+            title="Save XML file",
+            filetypes=[("XML Files", "*.xml")]
+        )
+        if xml_path:
+            # Stream the CSV rows straight into <rows>/<row>/<cell> markup
+            run_in_background(batchprocessor.csv_to_xml, csv_path, xml_path,
+                              f"CSV successfully converted to XML:\n{xml_path}")
 
 
 def xml_to_csv():
     """Convert an XML file (in the expected format) back to a CSV file."""
+    from tkinter import filedialog
+
     # Ask the user to select an XML file
     xml_path = filedialog.askopenfilename(
         title="Select XML file",
-        filetypes=[("XML Files", "*.xml")]
+        filetypes=[("XML Files", "*.xml *.xml.gz *.xml.bz2 *.xml.xz")]
     )
     if xml_path:
-        try:
-            # Parse the XML file
-            tree = ET.parse(xml_path)
-            root = tree.getroot()
-
-            # Gather the data in a list of lists
-            data = []
+        # Ask where to save the CSV
+        csv_path = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            title="Save CSV file",
+            filetypes=[("CSV Files", "*.csv")]
+        )
+        if csv_path:
             # Expecting structure: <rows><row><cell>...</cell>...</row>...</rows>
-            for row_elem in root.findall("row"):
-                row_data = []
-                for cell_elem in row_elem.findall("cell"):
-                    row_data.append(cell_elem.text if cell_elem.text else "")
-                data.append(row_data)
-
-            # Ask where to save the CSV
-            csv_path = filedialog.asksaveasfilename(
-                defaultextension=".csv",
-                title="Save CSV file",
-                filetypes=[("CSV Files", "*.csv")]
-            )
-            if csv_path:
-                # Write the CSV file
-                with open(csv_path, 'w', newline='', encoding='utf-8') as csv_file:
-                    writer = csv.writer(csv_file)
-                    writer.writerows(data)
-
-                messagebox.showinfo("Success", f"XML successfully converted to CSV:\n{csv_path}")
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred:\n{e}")
+            run_in_background(batchprocessor.xml_to_csv, xml_path, csv_path,
+                              f"XML successfully converted to CSV:\n{csv_path}")
 
 
 # ------------------------------
 # CSV <-> JSON Functions
 # ------------------------------
 def csv_to_json():
+    """Convert a CSV file to a JSON list of lists."""
+    from tkinter import filedialog
+
     # Ask the user to select a CSV file
     csv_path = filedialog.askopenfilename(
         title="Select CSV file",
-        filetypes=[("CSV Files", "*.csv")]
+        filetypes=[("CSV Files", "*.csv *.csv.gz *.csv.bz2 *.csv.xz")]
     )
     if csv_path:
-        try:
-            # Read the CSV file as a list of lists
-            with open(csv_path, 'r', newline='', encoding='utf-8') as csv_file:
-                reader = csv.reader(csv_file)
-                data = list(reader)  # each element is a list of cells in a row
-
-            # Ask where to save the JSON file
-            json_path = filedialog.asksaveasfilename(
-                defaultextension=".json",
-                title="Save JSON file",
-                filetypes=[("JSON Files", "*.json")]
-            )
-            if json_path:
-                # Write the list of lists to JSON
-                with open(json_path, 'w', encoding='utf-8') as json_file:
-                    json.dump(data, json_file, indent=4)
-
-                messagebox.showinfo("Success", f"CSV successfully converted to JSON:\n{json_path}")
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred:\n{e}")
+        # Ask where to save the JSON file
+        json_path = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            title="Save JSON file",
+            filetypes=[("JSON Files", "*.json")]
+        )
+        if json_path:
+            run_in_background(batchprocessor.csv_to_json, csv_path, json_path,
+                              f"CSV successfully converted to JSON:\n{json_path}")
 
 
 def json_to_csv():
+    """Convert a JSON list of lists, or nested XML structure, to a CSV file."""
+    from tkinter import filedialog
+
     # Ask the user to select a JSON file
     json_path = filedialog.askopenfilename(
         title="Select JSON file",
-        filetypes=[("JSON Files", "*.json")]
+        filetypes=[("JSON Files", "*.json *.json.gz *.json.bz2 *.json.xz")]
     )
     if json_path:
-        try:
-            # Read the JSON file
-            with open(json_path, 'r', encoding='utf-8') as json_file:
-                data = json.load(json_file)
-
-            # Check if the JSON is a list of lists (CSV format)...
-            if isinstance(data, list) and all(isinstance(row, list) for row in data):
-                rows = data
-            # ...or if it is a nested dictionary (from XML conversion)
-            elif isinstance(data, dict) and data.get("tag") == "rows":
-                rows = []
-                for row_dict in data.get("children", []):
-                    if row_dict.get("tag") == "row":
-                        row = []
-                        for cell in row_dict.get("children", []):
-                            if cell.get("tag") == "cell":
-                                row.append(cell.get("text", ""))
-                        rows.append(row)
-            else:
-                messagebox.showerror("Error", "JSON must contain a list of lists or a nested XML structure.")
-                return
-
-            # Ask where to save the CSV file
-            csv_path = filedialog.asksaveasfilename(
-                defaultextension=".csv",
-                title="Save CSV file",
-                filetypes=[("CSV Files", "*.csv")]
-            )
-            if csv_path:
-                # Write the rows back to CSV
-                with open(csv_path, 'w', newline='', encoding='utf-8') as csv_file:
-                    writer = csv.writer(csv_file)
-                    writer.writerows(rows)
-
-                messagebox.showinfo("Success", f"JSON successfully converted to CSV:\n{csv_path}")
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred:\n{e}")
+        # Ask where to save the CSV file
+        csv_path = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            title="Save CSV file",
+            filetypes=[("CSV Files", "*.csv")]
+        )
+        if csv_path:
+            run_in_background(batchprocessor.json_to_csv, json_path, csv_path,
+                              f"JSON successfully converted to CSV:\n{csv_path}")
 
 
 # ------------------------------
 # XML <-> JSON Functions
 # ------------------------------
-def xml_to_dict(element):
-    """
-    Recursively convert an ElementTree Element into a dictionary.
-    The returned dictionary has the keys:
-      - "tag": element's tag name
-      - "attributes": dictionary of element's attributes
-      - "text": element's text content (empty string if None)
-      - "children": list of dictionaries for each child
-    """
-    d = {
-        "tag": element.tag,
-        "attributes": dict(element.attrib),
-        "text": element.text if element.text else "",
-        "children": []
-    }
-    for child in element:
-        d["children"].append(xml_to_dict(child))
-    return d
-
-
-def dict_to_xml(d):
-    """
-    Reconstruct an ElementTree Element from a dictionary of the form:
-      {
-        "tag": "tag_name",
-        "attributes": { ... },
-        "text": "some text",
-        "children": [ {...}, {...}, ... ]
-      }
-    """
-    elem = ET.Element(d["tag"], d["attributes"])
-    elem.text = d["text"]
-    for child_dict in d["children"]:
-        child_elem = dict_to_xml(child_dict)
-        elem.append(child_elem)
-    return elem
-
-
 def xml_to_json():
     """Convert an XML file to a JSON file (nested dictionaries)."""
+    from tkinter import filedialog
+
     # Ask the user to select an XML file
     xml_path = filedialog.askopenfilename(
         title="Select XML file",
-        filetypes=[("XML Files", "*.xml"), ("All Files", "*.*")]
+        filetypes=[("XML Files", "*.xml *.xml.gz *.xml.bz2 *.xml.xz"), ("All Files", "*.*")]
     )
     if xml_path:
-        try:
-            # Parse the XML
-            tree = ET.parse(xml_path)
-            root = tree.getroot()
-
-            # Convert the root Element to a dictionary
-            data_dict = xml_to_dict(root)
-
-            # Ask user where to save the JSON file
-            json_path = filedialog.asksaveasfilename(
-                defaultextension=".json",
-                title="Save JSON file",
-                filetypes=[("JSON Files", "*.json"), ("All Files", "*.*")]
-            )
-            if json_path:
-                # Write the dictionary to JSON
-                with open(json_path, 'w', encoding='utf-8') as json_file:
-                    json.dump(data_dict, json_file, indent=4)
-
-                messagebox.showinfo("Success", f"XML successfully converted to JSON:\n{json_path}")
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred:\n{e}")
+        # Ask user where to save the JSON file
+        json_path = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            title="Save JSON file",
+            filetypes=[("JSON Files", "*.json"), ("All Files", "*.*")]
+        )
+        if json_path:
+            run_in_background(batchprocessor.xml_to_json, xml_path, json_path,
+                              f"XML successfully converted to JSON:\n{json_path}")
 
 
 def json_to_xml():
     """Convert a JSON file (nested dictionaries or list-of-lists) back to XML."""
+    from tkinter import filedialog
+
     # Ask the user to select a JSON file
     json_path = filedialog.askopenfilename(
         title="Select JSON file",
-        filetypes=[("JSON Files", "*.json"), ("All Files", "*.*")]
+        filetypes=[("JSON Files", "*.json *.json.gz *.json.bz2 *.json.xz"), ("All Files", "*.*")]
     )
     if json_path:
-        try:
-            # Load the JSON data
-            with open(json_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-
-            # Check if data is a nested dictionary (from xml_to_json)
-            if isinstance(data, dict) and "tag" in data:
-                root_elem = dict_to_xml(data)
-            # Or if it's a list-of-lists (from csv_to_json)
-            elif isinstance(data, list) and all(isinstance(row, list) for row in data):
-                root_elem = ET.Element("rows")
-                for row in data:
-                    row_elem = ET.SubElement(root_elem, "row")
-                    for cell in row:
-                        cell_elem = ET.SubElement(row_elem, "cell")
-                        cell_elem.text = cell if cell is not None else ""
-            else:
-                messagebox.showerror("Error", "JSON format not recognized for XML conversion.")
-                return
-
-            # Ask user where to save the XML file
-            xml_path = filedialog.asksaveasfilename(
-                defaultextension=".xml",
-                title="Save XML file",
-                filetypes=[("XML Files", "*.xml"), ("All Files", "*.*")]
-            )
-            if xml_path:
-                tree = ET.ElementTree(root_elem)
-                tree.write(xml_path, encoding="utf-8", xml_declaration=True)
-                messagebox.showinfo("Success", f"JSON successfully converted to XML:\n{xml_path}")
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred:\n{e}")
+        # Ask user where to save the XML file
+        xml_path = filedialog.asksaveasfilename(
+            defaultextension=".xml",
+            title="Save XML file",
+            filetypes=[("XML Files", "*.xml"), ("All Files", "*.*")]
+        )
+        if xml_path:
+            run_in_background(batchprocessor.json_to_xml, json_path, xml_path,
+                              f"JSON successfully converted to XML:\n{xml_path}")
 
 
 # ------------------------------
 # Main UI
 # ------------------------------
 def main():
+    # tkinter is only needed for the window itself, so headless imports of this module stay cheap
+    import tkinter as tk
+
     root = tk.Tk()
     root.title("File Converter")
 
@@ -315,4 +234,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
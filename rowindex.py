@@ -0,0 +1,129 @@
+import os
+import sys
+import json
+import itertools
+from array import array
+
+# The row index records the byte offset of every this many CSV records
+_INDEX_STRIDE = 1024
+
+# Row indexes are kept beside their CSV file under its name plus this suffix
+_INDEX_SUFFIX = ".rowidx"
+
+# Records are scanned in blocks of about this many bytes
+_SCAN_SIZE = 1 << 20
+
+
+def _scan_record_starts(mm, size, stride):
+    """Offsets of records 0, stride, 2 * stride, ... of the CSV in mm, and the record count"""
+    offsets = array("q")
+    if not size:
+        return offsets, 0
+    offsets.append(0)
+    records = 1
+    in_quotes = False
+    pos = 0
+    while pos < size:
+        # Blocks end just after a newline, so lines never straddle two of them
+        end = mm.find(b"\n", min(pos + _SCAN_SIZE, size) - 1)
+        end = size if end < 0 else end + 1
+        block = mm[pos:end]
+        lines = block.split(b"\n")
+        lines.pop()  # the text after the last newline, empty unless the file ends without one
+        ends = list(itertools.accumulate(map((1).__add__, map(len, lines)), initial=pos))[1:]
+        if in_quotes or b'"' in block:
+            quotes = itertools.accumulate((line.count(b'"') for line in lines), initial=in_quotes)
+            next(quotes)
+            starts = [line_end for line_end, count in zip(ends, quotes) if not count & 1]
+            in_quotes = bool((in_quotes + block.count(b'"')) & 1)
+        else:
+            starts = ends
+        if starts and starts[-1] == size:
+            starts.pop()
+        offsets.extend(starts[-records % stride::stride])
+        records += len(starts)
+        pos = end
+    return offsets, records
+
+
+class CsvRowIndex:
+    """Byte offsets of every stride-th record of a CSV file, for jumping straight to row N"""
+
+    def __init__(self, input_file, offsets, rows, stride, size, mtime_ns):
+        self.input_file = input_file
+        self.offsets = offsets
+        self.rows = rows
+        self.stride = stride
+        self.size = size
+        self.mtime_ns = mtime_ns
+
+    @property
+    def path(self):
+        return self.input_file + _INDEX_SUFFIX
+
+    @classmethod
+    def build(cls, input_file, stride=_INDEX_STRIDE):
+        """Index an uncompressed CSV file with one scan over an mmap of it"""
+        import mmap
+        from batchprocessor import split_format  # batchprocessor imports this module, so not at the top
+
+        if split_format(input_file)[2] is not None:
+            raise ValueError("Compressed files cannot be indexed")
+        with open(input_file, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            if stat.st_size:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    offsets, rows = _scan_record_starts(mm, stat.st_size, stride)
+            else:
+                offsets, rows = array("q"), 0
+        return cls(input_file, offsets, rows, stride, stat.st_size, stat.st_mtime_ns)
+
+    @classmethod
+    def load(cls, input_file):
+        """Read the saved index of input_file, or None if there is none or the file has changed since"""
+        try:
+            stat = os.stat(input_file)
+            with open(input_file + _INDEX_SUFFIX, 'rb') as f:
+                header = json.loads(f.readline())
+                if (header.get("version") != 1 or header["size"] != stat.st_size
+                        or header["mtime_ns"] != stat.st_mtime_ns):
+                    return None
+                offsets = array("q")
+                offsets.frombytes(f.read())
+        except (OSError, ValueError, KeyError):
+            return None
+        if sys.byteorder == "big":
+            offsets.byteswap()
+        return cls(input_file, offsets, header["rows"], header["stride"], header["size"], header["mtime_ns"])
+
+    def save(self):
+        """Write the index beside its CSV file (atomically, little-endian offsets after a JSON header line)"""
+        header = {"version": 1, "size": self.size, "mtime_ns": self.mtime_ns,
+                  "stride": self.stride, "rows": self.rows}
+        offsets = array("q", self.offsets)
+        if sys.byteorder == "big":
+            offsets.byteswap()
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(json.dumps(header).encode("ascii") + b"\n")
+            offsets.tofile(f)
+        os.replace(temp_path, self.path)
+
+    def seek(self, row):
+        """Return (offset, skip): where to start reading, and how many records to skip there, to reach row"""
+        if row >= self.rows:
+            return self.size, 0
+        return self.offsets[row // self.stride], row % self.stride
+
+
+def csv_row_index(input_file, save=True):
+    """Return the row index of a CSV file, loading its saved copy or building it (and saving it if possible)"""
+    index = CsvRowIndex.load(input_file)
+    if index is None:
+        index = CsvRowIndex.build(input_file)
+        if save:
+            try:
+                index.save()
+            except OSError:
+                pass  # a read-only folder just means the index is rebuilt next time
+    return index
@@ -0,0 +1,394 @@
+import io
+import os
+import sys
+import csv
+import asyncio
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qs
+import batchprocessor
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Request bodies are read, and responses sent, in pieces of this size
+_CHUNK_SIZE = 64 << 10
+
+# Seconds a connection may sit idle, between requests or mid-transfer, before it is closed
+_IDLE_TIMEOUT = 60.0
+
+# Largest request body accepted by default; bigger ones are answered with 413
+DEFAULT_MAX_BODY = 1 << 30
+
+# Output a client may leave unread while still sending its body before the conversion is stopped
+_MAX_UNDRAINED = 16 << 20
+
+_CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "json": "application/json",
+    "xml": "application/xml",
+    "ndjson": "application/x-ndjson",
+}
+
+# Input formats recognised from a request's Content-Type when ?from= is not given
+_FORMAT_TYPES = {
+    "text/csv": "csv",
+    "application/json": "json",
+    "application/xml": "xml",
+    "text/xml": "xml",
+    "application/x-ndjson": "ndjson",
+}
+
+
+# ------------------------------
+# HTTP Messages
+# ------------------------------
+
+def _head(status, headers):
+    """Status line and headers of a response"""
+    lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}"]
+    lines.extend(f"{name}: {value}" for name, value in headers)
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+def _parse_head(head):
+    """Split a request head into method, target, version and a dict of lower-cased headers"""
+    lines = head.decode("latin-1").split("\r\n")
+    method, target, version = lines[0].split(" ")
+    if not version.startswith("HTTP/1."):
+        raise ValueError(f"Unsupported protocol: {version}")
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, colon, value = line.partition(":")
+            if not colon:
+                raise ValueError(f"Malformed header: {line}")
+            headers[name.strip().lower()] = value.strip()
+    return method, target, version, headers
+
+
+class _RequestBody:
+    """A Content-Length or chunked request body, read from the connection a piece at a time"""
+
+    def __init__(self, reader, headers, limit=None):
+        self._reader = reader
+        self._chunked = "chunked" in headers.get("transfer-encoding", "").lower()
+        self._remaining = 0 if self._chunked else int(headers.get("content-length", 0))
+        if self._remaining < 0:
+            raise ValueError("Negative Content-Length")
+        self._limit = limit
+        self._received = 0
+        self.too_large = limit is not None and self._remaining > limit
+        self.done = not self._chunked and not self._remaining
+
+    async def read(self):
+        if self.done:
+            return b""
+        reader = self._reader
+        if self._chunked and not self._remaining:
+            size_line = await asyncio.wait_for(reader.readline(), _IDLE_TIMEOUT)
+            size = int(size_line.split(b";")[0], 16)
+            if size == 0:
+                # Skip any trailer headers up to the blank line
+                while (await asyncio.wait_for(reader.readline(), _IDLE_TIMEOUT)).strip():
+                    pass
+                self.done = True
+                return b""
+            self._remaining = size
+            if self._limit is not None and self._received + size > self._limit:
+                self.too_large = True
+                raise ValueError(f"Request body larger than {self._limit} bytes")
+        data = await asyncio.wait_for(reader.read(min(self._remaining, _CHUNK_SIZE)), _IDLE_TIMEOUT)
+        if not data:
+            raise ConnectionError("Request body ended early")
+        self._received += len(data)
+        self._remaining -= len(data)
+        if not self._remaining:
+            if self._chunked:
+                await asyncio.wait_for(reader.readexactly(2), _IDLE_TIMEOUT)
+            else:
+                self.done = True
+        return data
+
+    async def drain(self):
+        """Read and discard whatever the conversion left of the body"""
+        while await self.read():
+            pass
+
+
+class _Response:
+    """A streamed 200 response, written as chunks once it outgrows one piece"""
+
+    def __init__(self, writer, body, output_format, keep_alive, chunked):
+        self._writer = writer
+        self._body = body
+        self._content_type = _CONTENT_TYPES[output_format]
+        self._keep_alive = keep_alive
+        self._chunked = chunked
+        self._held = b""
+        self.started = False
+
+    async def send(self, data):
+        if self._writer.is_closing():
+            raise ConnectionResetError("The client closed the connection")
+        if not self.started:
+            if not self._held:
+                self._held = data
+                return
+            headers = [("Content-Type", self._content_type)]
+            if self._chunked:
+                headers.append(("Transfer-Encoding", "chunked"))
+            headers.append(("Connection", "keep-alive" if self._keep_alive else "close"))
+            self._writer.write(_head(200, headers))
+            self.started = True
+            self._write(self._held)
+            self._held = b""
+        self._write(data)
+        # Most clients only read the response once the request is sent, so only wait for them after the body
+        if self._body.done:
+            await asyncio.wait_for(self._writer.drain(), _IDLE_TIMEOUT)
+        elif self._writer.transport.get_write_buffer_size() > _MAX_UNDRAINED:
+            raise RuntimeError(f"More than {_MAX_UNDRAINED} bytes of output left unread while the body was sent")
+
+    def _write(self, data):
+        if self._chunked:
+            self._writer.writelines([b"%x\r\n" % len(data), data, b"\r\n"])
+        else:
+            self._writer.write(data)
+
+    async def finish(self):
+        if self.started:
+            if self._chunked:
+                self._writer.write(b"0\r\n\r\n")
+        else:
+            self._writer.write(_head(200, [("Content-Type", self._content_type),
+                                           ("Content-Length", len(self._held)),
+                                           ("Connection", "keep-alive" if self._keep_alive else "close")]))
+            self._writer.write(self._held)
+        await asyncio.wait_for(self._writer.drain(), _IDLE_TIMEOUT)
+
+
+async def _send_error(writer, status, message, headers=()):
+    body = f"{message}\n".encode("utf-8")
+    writer.write(_head(status, [("Content-Type", "text/plain; charset=utf-8"), ("Content-Length", len(body)),
+                                ("Connection", "close"), *headers]) + body)
+    await asyncio.wait_for(writer.drain(), _IDLE_TIMEOUT)
+
+
+# ------------------------------
+# Worker Thread Streams
+# ------------------------------
+
+class _BodyReader(io.RawIOBase):
+    """Blocking raw stream over a _RequestBody, for a conversion running on a worker thread"""
+
+    def __init__(self, body, loop):
+        self._body = body
+        self._loop = loop
+        self._pending = memoryview(b"")
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if not self._pending:
+            self._pending = memoryview(asyncio.run_coroutine_threadsafe(self._body.read(), self._loop).result())
+        count = min(len(buffer), len(self._pending))
+        buffer[:count] = self._pending[:count]
+        self._pending = self._pending[count:]
+        return count
+
+
+class _ResponseWriter(io.RawIOBase):
+    """Blocking raw stream into a _Response, for a conversion running on a worker thread"""
+
+    def __init__(self, response, loop):
+        self._response = response
+        self._loop = loop
+        self._aborted = False
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        if not self._aborted:
+            asyncio.run_coroutine_threadsafe(self._response.send(bytes(data)), self._loop).result()
+        return len(data)
+
+    def abort(self):
+        self._aborted = True
+
+
+def _convert(body, response, input_format, output_format, compact, typed):
+    """Run convert_stream between a request body and a response, on a worker thread"""
+    # Streams are layered the way batchprocessor opens files for convert_stream
+    input_stream = io.BufferedReader(body, _CHUNK_SIZE)
+    if input_format != "xml":
+        input_stream = io.TextIOWrapper(input_stream, encoding='utf-8',
+                                        newline='' if input_format == "csv" else None)
+    output_stream = io.TextIOWrapper(io.BufferedWriter(response, _CHUNK_SIZE), encoding='utf-8',
+                                     errors='xmlcharrefreplace' if output_format == "xml" else 'strict',
+                                     newline='' if output_format in ("csv", "ndjson") else None)
+    try:
+        batchprocessor.convert_stream(input_stream, output_stream, input_format, output_format,
+                                      compact=compact, typed=typed)
+        output_stream.close()
+    except BaseException:
+        response.abort()
+        raise
+
+
+# ------------------------------
+# Service
+# ------------------------------
+
+def _flag(params, name):
+    return params.get(name, [""])[-1].lower() in ("1", "true", "yes")
+
+
+class ConversionService:
+    """Converts request bodies over HTTP on localhost, streaming the result back"""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, max_concurrent=None, max_body=DEFAULT_MAX_BODY):
+        self.host = host
+        self.port = port
+        self.max_concurrent = max_concurrent or os.cpu_count() or 1
+        self.max_body = max_body
+        self._server = None
+
+    async def start(self):
+        """Start listening; port 0 picks a free port, stored back in self.port"""
+        self._slots = asyncio.Semaphore(self.max_concurrent)
+        self._executor = batchprocessor.make_executor("thread", self.max_concurrent)
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self._server
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        try:
+            async with self._server:
+                await self._server.serve_forever()
+        finally:
+            self._executor.shutdown(wait=False)
+
+    async def _handle(self, reader, writer):
+        try:
+            keep_alive = True
+            while keep_alive:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), _IDLE_TIMEOUT)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await _send_error(writer, 431, "Request headers too large")
+                    break
+                keep_alive = await self._request(head, reader, writer)
+        except (ConnectionError, asyncio.TimeoutError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _request(self, head, reader, writer):
+        """Answer one request; returns whether the connection can take another"""
+        try:
+            method, target, version, headers = _parse_head(head)
+        except ValueError as e:
+            await _send_error(writer, 400, f"Bad request: {e}")
+            return False
+
+        url = urlsplit(target)
+        if url.path != "/convert":
+            await _send_error(writer, 404, f"Not found: {url.path}")
+            return False
+        if method != "POST":
+            await _send_error(writer, 405, "Use POST /convert", [("Allow", "POST")])
+            return False
+
+        params = parse_qs(url.query)
+        output_format = params.get("to", [""])[-1].lower()
+        input_format = (params.get("from", [""])[-1].lower()
+                        or _FORMAT_TYPES.get(headers.get("content-type", "").split(";")[0].strip().lower(), ""))
+        for name, file_format in (("from", input_format), ("to", output_format)):
+            if file_format not in _CONTENT_TYPES:
+                await _send_error(writer, 400, f"Unsupported or missing {name} format: {file_format or '-'}")
+                return False
+        try:
+            body = _RequestBody(reader, headers, self.max_body)
+        except ValueError:
+            await _send_error(writer, 400, "Invalid Content-Length")
+            return False
+        if body.too_large:
+            await _send_error(writer, 413, f"Request body larger than {self.max_body} bytes")
+            return False
+
+        keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+        loop = asyncio.get_running_loop()
+        async with self._slots:
+            if headers.get("expect", "").lower() == "100-continue":
+                writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+            response = _Response(writer, body, output_format, keep_alive, chunked=version == "HTTP/1.1")
+            try:
+                await loop.run_in_executor(self._executor, _convert, _BodyReader(body, loop),
+                                           _ResponseWriter(response, loop), input_format, output_format,
+                                           _flag(params, "compact"), _flag(params, "typed"))
+            except Exception as e:
+                message = f"Error converting {input_format} to {output_format}: {e or type(e).__name__}"
+                if response.started:
+                    # Too late for an error status; resetting mid-body marks the response as cut short
+                    # and drops any output still buffered for a client that is not reading
+                    print(message, file=sys.stderr)
+                    writer.transport.abort()
+                elif body.too_large:
+                    await _send_error(writer, 413, f"Request body larger than {self.max_body} bytes")
+                else:
+                    bad_input = isinstance(e, (ValueError, SyntaxError, csv.Error))
+                    await _send_error(writer, 400 if bad_input else 500, message)
+                return False
+            await response.finish()
+        if keep_alive:
+            await body.drain()
+        return keep_alive
+
+
+# ------------------------------
+# Command Line
+# ------------------------------
+
+def main(argv=None):
+    """Run the service until interrupted: python service.py [--port PORT]"""
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        prog="python service.py",
+        description="Serve CSV, JSON, XML and NDJSON conversions over HTTP: POST /convert?from=csv&to=json",
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"address to listen on (default: {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"port to listen on (default: {DEFAULT_PORT})")
+    parser.add_argument("-j", "--workers", type=int,
+                        help="conversions run at once; more requests wait their turn (default: CPU count)")
+    parser.add_argument("--max-body", type=int, default=DEFAULT_MAX_BODY, metavar="BYTES",
+                        help=f"largest request body accepted, 0 for no limit (default: {DEFAULT_MAX_BODY})")
+    args = parser.parse_args(argv)
+
+    service = ConversionService(args.host, args.port, args.workers, args.max_body or None)
+
+    async def serve():
+        await service.start()
+        print(f"Serving conversions on http://{service.host}:{service.port}/convert (Ctrl-C to stop)",
+              file=sys.stderr)
+        await service.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,22 @@
+import os
+import sys
+import csv
+
+import pytest
+
+# The modules live at the top of the repository rather than in an installed package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def quoted_csv(tmp_path):
+    """Write a CSV file whose quoted fields hold commas, quotes, markup and embedded newlines"""
+    def write(rows=300, name="quoted.csv"):
+        path = tmp_path / name
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(["id", "note", "quote"])
+            for i in range(rows):
+                writer.writerow([i, f"line one\nline two {i}\r\nline three", f'say "hi" <{i}> & café,ok'])
+        return path
+    return write
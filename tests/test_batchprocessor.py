@@ -0,0 +1,633 @@
+import io
+import os
+import bz2
+import csv
+import gzip
+import json
+import lzma
+import time
+import threading
+import multiprocessing
+import xml.etree.ElementTree as ET
+
+import pytest
+
+import batchprocessor
+
+
+# ------------------------------
+# Streaming Writers
+# ------------------------------
+
+def _read_csv(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.reader(f))
+
+
+def test_csv_to_xml_matches_element_tree(tmp_path, quoted_csv):
+    path = quoted_csv(rows=50)
+    with open(path, 'a', newline='', encoding='utf-8') as f:
+        f.write('\r\n,,\r\n')  # an empty row and a row of empty cells
+    root = ET.Element("rows")
+    for row in _read_csv(path):
+        row_elem = ET.SubElement(root, "row")
+        for cell_value in row:
+            ET.SubElement(row_elem, "cell").text = cell_value
+    expected = tmp_path / "expected.xml"
+    ET.ElementTree(root).write(expected, encoding="utf-8", xml_declaration=True)
+
+    output = tmp_path / "quoted.xml"
+    batchprocessor.csv_to_xml(str(path), str(output))
+    assert output.read_bytes() == expected.read_bytes()
+
+_ROWS_XML = ('<?xml version="1.0" encoding="utf-8"?>\n<rows>\n  <row><cell>a &amp; b</cell><cell/></row>\n'
+             '  <meta><row><cell>nested rows are not rows</cell></row></meta>\n'
+             '  <row><cell>café</cell><cell>line\none</cell><cell>"q",x</cell></row>\n  <row/>\n</rows>\n')
+
+
+def test_xml_to_csv_matches_element_tree(tmp_path):
+    path = tmp_path / "rows.xml"
+    path.write_text(_ROWS_XML, encoding="utf-8")
+    expected = tmp_path / "expected.csv"
+    with open(expected, 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerows([[cell.text or "" for cell in row.findall("cell")]
+                                 for row in ET.parse(path).getroot().findall("row")])
+
+    output = tmp_path / "rows.csv"
+    batchprocessor.xml_to_csv(str(path), str(output))
+    assert output.read_bytes() == expected.read_bytes()
+
+
+def test_failed_conversion_keeps_the_previous_output(tmp_path):
+    path = tmp_path / "broken.xml"
+    path.write_text("<rows>" + "<row><cell>x</cell></row>" * 10000 + "<row>", encoding="utf-8")
+    output = tmp_path / "broken.csv"
+    output.write_text("old\n", encoding="utf-8")
+    with pytest.raises(RuntimeError, match="Error converting XML to CSV"):
+        batchprocessor.xml_to_csv(str(path), str(output))
+    assert output.read_text(encoding="utf-8") == "old\n"
+    assert sorted(os.listdir(tmp_path)) == ["broken.csv", "broken.xml"]
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_csv_to_json_matches_json_dump(tmp_path, quoted_csv, compact):
+    path = quoted_csv(rows=50)
+    with open(path, 'a', newline='', encoding='utf-8') as f:
+        f.write('\r\n,,\r\n')
+    rows = _read_csv(path)
+    if compact:
+        expected = json.dumps(rows, separators=(",", ":"))
+    else:
+        expected = json.dumps(rows, indent=4)
+
+    output = tmp_path / "quoted.json"
+    batchprocessor.csv_to_json(str(path), str(output), compact=compact)
+    assert output.read_text(encoding="utf-8") == expected
+
+# ------------------------------
+# Incremental Readers
+# ------------------------------
+
+_ELEMENTS = [[1, "a,b"], {"k": [1, 2, {"deep": "]}"}]}, "text with \\\" and [", 3.5, None, True, [], {}]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64])
+@pytest.mark.parametrize("indent", [None, 4])
+def test_json_array_reader_across_chunk_boundaries(chunk_size, indent):
+    text = json.dumps(_ELEMENTS, indent=indent)
+    reader = batchprocessor.JsonArrayReader(io.StringIO(text), chunk_size=chunk_size)
+    assert reader.is_array
+    assert list(reader) == _ELEMENTS
+
+
+@pytest.mark.parametrize("text", ["[]", " [ ] ", "[\n]"])
+def test_json_array_reader_empty(text):
+    reader = batchprocessor.JsonArrayReader(io.StringIO(text), chunk_size=1)
+    assert list(reader) == []
+
+
+def test_json_array_reader_falls_back_to_load():
+    reader = batchprocessor.JsonArrayReader(io.StringIO('  {"tag": "a"}'), chunk_size=2)
+    assert not reader.is_array
+    assert reader.load() == {"tag": "a"}
+
+
+@pytest.mark.parametrize("text", ["[1, 2", "[1 2]", "[1,, 2]"])
+def test_json_array_reader_rejects_malformed_arrays(text):
+    with pytest.raises(ValueError):
+        list(batchprocessor.JsonArrayReader(io.StringIO(text), chunk_size=1))
+
+
+@pytest.mark.parametrize("text", [
+    '[\n    ["a", "b"],\n    ["c" "d"]\n]',
+    '[["a"],\n["b"],\n["c"],\n tru]',
+    '{"tag": "rows",\n "children": [1, 2,]}',
+])
+def test_json_decode_errors_point_into_the_file(text):
+    with pytest.raises(json.JSONDecodeError) as expected:
+        json.loads(text)
+    reader = batchprocessor.JsonArrayReader(io.StringIO(text), chunk_size=4)
+    with pytest.raises(json.JSONDecodeError) as error:
+        list(reader) if reader.is_array else reader.load()
+    assert (error.value.pos, error.value.lineno, error.value.colno) == \
+        (expected.value.pos, expected.value.lineno, expected.value.colno)
+
+
+def test_json_to_csv_matches_csv_writer(tmp_path):
+    rows = [["a", "b,c"], [], ["multi\nline", 'say "hi"', "café"], [1, 2.5, None, True]]
+    path = tmp_path / "rows.json"
+    path.write_text(json.dumps(rows, indent=4), encoding="utf-8")
+    expected = tmp_path / "expected.csv"
+    with open(expected, 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerows(rows)
+
+    output = tmp_path / "rows.csv"
+    batchprocessor.json_to_csv(str(path), str(output))
+    assert output.read_bytes() == expected.read_bytes()
+
+# ------------------------------
+# Process Backend
+# ------------------------------
+
+def test_process_backend_matches_thread_backend(tmp_path, quoted_csv):
+    for i in range(4):
+        quoted_csv(rows=20 * i, name=f"part{i}.csv")
+    outputs = {}
+    for backend in ("thread", "process"):
+        results = batchprocessor.batch_process(str(tmp_path), "json", backend=backend, max_workers=2,
+                                               output_dir=str(tmp_path / backend))
+        assert results.converted == 4 and not results.errors
+        outputs[backend] = {os.path.basename(path): open(path, 'rb').read() for path in results}
+    assert outputs["process"] == outputs["thread"]
+
+
+_convert_file = batchprocessor.convert_file
+
+
+def _die_on_part3(input_file, *args, **kwargs):
+    if input_file.endswith("part3.csv"):
+        os._exit(1)
+    return _convert_file(input_file, *args, **kwargs)
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != "fork", reason="workers must inherit the patched module")
+def test_dead_worker_fails_its_file_and_the_batch_goes_on(tmp_path, quoted_csv, monkeypatch):
+    for i in range(6):
+        quoted_csv(rows=i + 1, name=f"part{i}.csv")
+    monkeypatch.setattr(batchprocessor, "convert_file", _die_on_part3)
+    results = batchprocessor.batch_process(str(tmp_path), "json", backend="process", max_workers=2)
+    assert results.failed >= 1 and results.converted + results.failed == 6
+    assert str(tmp_path / "part3.csv") in [record.input_file for record in results.errors]
+    assert not any(name.endswith(".part") for name in os.listdir(tmp_path))
+
+# ------------------------------
+# Parallel Conversion
+# ------------------------------
+
+def test_csv_chunks_end_on_record_boundaries(quoted_csv):
+    path = quoted_csv()
+    chunks = batchprocessor.find_csv_chunks(str(path), chunk_size=37)
+    assert len(chunks) > 1
+    assert chunks[0][0] == 0 and chunks[-1][1] == path.stat().st_size
+    assert all(end == start for (_, end), (start, _) in zip(chunks, chunks[1:]))
+
+    data = path.read_bytes()
+    rows = []
+    for start, end in chunks:
+        rows.extend(csv.reader(io.StringIO(data[start:end].decode("utf-8"), newline="")))
+    assert rows == _read_csv(path)
+
+
+@pytest.mark.parametrize("output_format", ["json", "xml"])
+def test_parallel_conversion_matches_serial(tmp_path, quoted_csv, output_format):
+    path = quoted_csv()
+    serial = batchprocessor.convert_file(str(path), output_format, output_dir=str(tmp_path / "serial"))
+    assert serial.ok
+    parallel = tmp_path / f"parallel.{output_format}"
+    batchprocessor.parallel_conversion(str(path), str(parallel), output_format, chunk_size=64, max_workers=2)
+    with open(serial.output, 'rb') as f:
+        assert parallel.read_bytes() == f.read()
+
+# ------------------------------
+# Manifest
+# ------------------------------
+
+def _batch(folder, **options):
+    return batchprocessor.batch_process(str(folder), "json", manifest=True, **options)
+
+
+def test_manifest_skips_unchanged_inputs(tmp_path, quoted_csv):
+    path = quoted_csv(rows=10)
+    first = _batch(tmp_path)
+    assert (first.converted, first.skipped) == (1, 0)
+
+    second = _batch(tmp_path)
+    assert (second.converted, second.skipped) == (0, 1)
+    assert list(second) == list(first) == [str(tmp_path / "quoted.json")]
+
+    # A touch changes the mtime but not the content, which the hash confirms
+    os.utime(path, ns=(path.stat().st_atime_ns, path.stat().st_mtime_ns + 10 ** 9))
+    assert _batch(tmp_path).skipped == 1
+
+
+@pytest.mark.parametrize("change", ["edit", "delete output", "options"])
+def test_manifest_reconverts_changed_inputs(tmp_path, quoted_csv, change):
+    path = quoted_csv(rows=10)
+    _batch(tmp_path)
+    options = {}
+    if change == "edit":
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write("more,rows,here\n")
+    elif change == "delete output":
+        os.remove(tmp_path / "quoted.json")
+    else:
+        options["compact"] = True
+    results = _batch(tmp_path, **options)
+    assert (results.converted, results.skipped) == (1, 0)
+    with open(tmp_path / "quoted.json", encoding='utf-8') as f:
+        assert json.load(f) == _read_csv(path)
+
+
+def test_manifest_reports_mirrored_outputs(tmp_path, quoted_csv):
+    quoted_csv(rows=10)
+    output_dir = os.path.join(str(tmp_path), "out", "..", "out")
+    first = _batch(tmp_path, output_dir=output_dir)
+    second = _batch(tmp_path, output_dir=output_dir)
+    assert second.skipped == 1 and list(second) == list(first)
+
+# ------------------------------
+# Single-Parse Fan-Out
+# ------------------------------
+
+def test_fan_out_matches_single_conversions(tmp_path, quoted_csv, monkeypatch):
+    path = quoted_csv(rows=50)
+    expected = {}
+    for output_format in ("json", "xml", "ndjson"):
+        record = batchprocessor.convert_file(str(path), output_format, output_dir=str(tmp_path / "single"))
+        with open(record.output, 'rb') as f:
+            expected[output_format] = f.read()
+
+    opened = []
+    open_input = batchprocessor._open_input
+
+    def counting_open_input(input_file, *args, **kwargs):
+        opened.append(input_file)
+        return open_input(input_file, *args, **kwargs)
+
+    monkeypatch.setattr(batchprocessor, "_open_input", counting_open_input)
+    outputs = batchprocessor.convert_to_formats(str(path), ["json", "xml", "ndjson"],
+                                                output_dir=str(tmp_path / "fan"))
+    assert opened == [str(path)]
+    assert [os.path.basename(output) for output in outputs] == ["quoted.json", "quoted.xml", "quoted.ndjson"]
+    for output_format, output in zip(("json", "xml", "ndjson"), outputs):
+        with open(output, 'rb') as f:
+            assert f.read() == expected[output_format]
+
+# ------------------------------
+# Typed Conversion
+# ------------------------------
+
+@pytest.mark.parametrize("output_format", ["json", "ndjson"])
+def test_typed_csv_writes_numbers(tmp_path, output_format):
+    path = tmp_path / "typed.csv"
+    path.write_text("id,price,name\n1,2.50,ann\n2,,007\n", encoding="utf-8")
+    record = batchprocessor.convert_file(str(path), output_format, typed=True)
+    with open(record.output, encoding="utf-8") as f:
+        text = f.read()
+    rows = json.loads(text) if output_format == "json" else [json.loads(line) for line in text.splitlines()]
+    assert rows == [["id", "price", "name"], [1, 2.5, "ann"], [2, None, "007"]]
+
+# ------------------------------
+# Instrumentation
+# ------------------------------
+
+def test_conversion_result_records_sizes_rows_and_stages(tmp_path, quoted_csv):
+    path = quoted_csv(rows=50)
+    record = batchprocessor.convert_file(str(path), "xml")
+    assert record.ok and record.output == str(tmp_path / "quoted.xml")
+    assert record.rows == 51
+    assert record.bytes_in == path.stat().st_size
+    assert record.bytes_out == (tmp_path / "quoted.xml").stat().st_size
+    assert {"read", "parse", "serialize", "write"} >= record.stages.keys() >= {"parse", "serialize"}
+    assert sum(record.stages.values()) <= record.seconds * 1.01 + 1e-3
+    assert json.loads(json.dumps(record.as_dict()))["rows"] == 51
+
+
+def test_conversion_failures_are_recorded(tmp_path):
+    path = tmp_path / "broken.json"
+    path.write_text('[["a"], ["b"', encoding="utf-8")
+    record = batchprocessor.convert_file(str(path), "csv")
+    assert not record.ok and record.output is None
+    assert "Error converting JSON to CSV" in record.error
+
+
+def test_batch_summary(tmp_path, quoted_csv):
+    quoted_csv(rows=10, name="a.csv")
+    quoted_csv(rows=20, name="b.csv")
+    (tmp_path / "c.json").write_text("[1", encoding="utf-8")
+    results = batchprocessor.batch_process(str(tmp_path), "xml")
+    summary = results.summary()
+    assert (summary["files"], summary["converted"], summary["failed"]) == (3, 2, 1)
+    assert summary["rows"] == 11 + 21
+    assert summary["bytes_in"] == (tmp_path / "a.csv").stat().st_size + (tmp_path / "b.csv").stat().st_size
+
+# ------------------------------
+# Background Jobs
+# ------------------------------
+
+def _job_events(job):
+    events = []
+    while not events or events[-1][0] not in ("done", "error"):
+        events.append(job.events.get(timeout=30))
+    return events
+
+
+def test_conversion_job_reports_through_its_queue(tmp_path, quoted_csv):
+    quoted_csv(rows=10, name="a.csv")
+    quoted_csv(rows=10, name="b.csv")
+    events = _job_events(batchprocessor.ConversionJob(str(tmp_path), "json").start())
+    assert [kind for kind, _ in events] == ["start", "result", "result", "done"]
+    assert events[0][1] == 2 and events[-1][1].converted == 2
+
+
+def test_conversion_job_reports_failed_files(tmp_path):
+    path = tmp_path / "broken.json"
+    path.write_text("[1", encoding="utf-8")
+    events = _job_events(batchprocessor.ConversionJob(str(path), "csv").start())
+    assert [kind for kind, _ in events] == ["start", "result", "done"]
+    assert not events[1][1].ok and events[-1][1].failed == 1
+
+# ------------------------------
+# Folder Discovery
+# ------------------------------
+
+@pytest.fixture
+def lake(tmp_path):
+    for name in ("a.csv", "2024/b.csv", "2024/c.json", "2024/q1/e.csv", "archive/d.csv", "notes.txt"):
+        path = tmp_path / "lake" / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text('[["x"]]' if name.endswith(".json") else "x\n", encoding="utf-8")
+    return tmp_path / "lake"
+
+
+def _relative(folder, paths):
+    return sorted(os.path.relpath(path, folder).replace(os.sep, "/") for path in paths)
+
+
+@pytest.mark.parametrize("options, expected", [
+    ({}, ["a.csv"]),
+    ({"recursive": True}, ["2024/b.csv", "2024/c.json", "2024/q1/e.csv", "a.csv", "archive/d.csv"]),
+    ({"recursive": True, "include": ["*.csv"], "exclude": ["archive"]}, ["2024/b.csv", "2024/q1/e.csv", "a.csv"]),
+    ({"recursive": True, "include": ["2024/*"], "exclude": ["*/q1"]}, ["2024/b.csv", "2024/c.json"]),
+])
+def test_find_inputs(lake, options, expected):
+    inputs = batchprocessor.find_inputs(str(lake), **options)
+    assert _relative(lake, [path for path, _ in inputs]) == expected
+    assert all(size == os.path.getsize(path) for path, size in inputs)
+
+
+def test_outputs_mirror_the_input_tree(lake):
+    output_dir = lake / "out"
+    for _ in range(2):  # the second run must not pick up the first run's outputs
+        results = batchprocessor.batch_process(str(lake), "json", recursive=True, include=["*.csv"],
+                                               output_dir=str(output_dir))
+        assert results.converted == 4 and not results.errors
+    assert _relative(output_dir, results) == ["2024/b.json", "2024/q1/e.json", "a.json", "archive/d.json"]
+    with open(output_dir / "2024" / "q1" / "e.json", encoding="utf-8") as f:
+        assert json.load(f) == [["x"]]
+
+# ------------------------------
+# XML and Nested JSON
+# ------------------------------
+
+_XML = ('<?xml version="1.0"?>\n<root version="2" kind="a&amp;b">head<item id="1">one<sub/>tail</item>'
+        '<item id="2">&lt;two&gt; "quoted"</item>\n  <empty></empty>café \U0001f600</root>')
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_stream_xml_to_json_matches_json_dump(compact):
+    expected = io.StringIO()
+    root = ET.fromstring(_XML.encode("utf-8"))
+    if compact:
+        json.dump(batchprocessor.xml_to_dict(root), expected, separators=(",", ":"))
+    else:
+        json.dump(batchprocessor.xml_to_dict(root), expected, indent=4)
+    output = io.StringIO()
+    batchprocessor.stream_xml_to_json(io.BytesIO(_XML.encode("utf-8")), output, compact=compact)
+    assert output.getvalue() == expected.getvalue()
+
+
+def test_deep_xml_converts_to_json(tmp_path):
+    depth = 5000
+    xml_path = tmp_path / "deep.xml"
+    xml_path.write_text("<a>" * depth + "x" + "</a>" * depth, encoding="utf-8")
+    record = batchprocessor.convert_file(str(xml_path), "json", compact=True)
+    assert record.ok
+    with open(record.output, encoding="utf-8") as f:
+        text = f.read()
+    assert text.count('"tag":"a"') == depth and '"text":"x"' in text
+
+def test_write_dict_as_xml_matches_element_tree():
+    data = batchprocessor.xml_to_dict(ET.fromstring(_XML.encode("utf-8")))
+    data["children"].append({"tag": "extra", "attributes": {"q": "<\"&'>\n\t"}, "text": "a]]>b\r",
+                             "children": []})
+    expected = io.StringIO()
+    ET.ElementTree(batchprocessor.dict_to_xml(data)).write(expected, encoding="unicode")
+    output = io.StringIO()
+    elements = batchprocessor.write_dict_as_xml(data, output)
+    assert output.getvalue() == expected.getvalue()
+    assert elements == 6
+
+
+def test_deep_xml_round_trips_without_recursion(tmp_path):
+    depth = 5000
+    xml_path = tmp_path / "deep.xml"
+    xml_path.write_text("<a>" * depth + "x" + "</a>" * depth, encoding="utf-8")
+    json_path = batchprocessor.convert_file(str(xml_path), "json", compact=True).output
+    back = batchprocessor.convert_file(json_path, "xml", output_dir=str(tmp_path / "back"))
+    assert back.ok
+    xml = (tmp_path / "back" / "deep.xml").read_text(encoding="utf-8")
+    assert xml.startswith("<?xml") and xml.endswith(xml_path.read_text(encoding="utf-8"))
+
+# ------------------------------
+# Compression
+# ------------------------------
+
+_CODECS = {"gz": gzip, "bz2": bz2, "xz": lzma}
+
+
+@pytest.mark.parametrize("compression", sorted(_CODECS))
+def test_compressed_round_trip(tmp_path, quoted_csv, compression):
+    path = quoted_csv(rows=50)
+    plain = batchprocessor.convert_file(str(path), "json", output_dir=str(tmp_path / "plain"))
+    packed = tmp_path / f"packed.csv.{compression}"
+    packed.write_bytes(_CODECS[compression].compress(path.read_bytes()))
+
+    record = batchprocessor.convert_file(str(packed), "json")
+    assert record.output == str(tmp_path / f"packed.json.{compression}")
+    with open(plain.output, 'rb') as f, open(record.output, 'rb') as g:
+        assert _CODECS[compression].decompress(g.read()) == f.read()
+
+    back = batchprocessor.convert_file(record.output, "csv", output_dir=str(tmp_path / "back"),
+                                       compression="none")
+    assert back.output == str(tmp_path / "back" / "packed.csv")
+    with open(back.output, 'rb') as f:
+        assert f.read() == path.read_bytes()
+
+
+@pytest.mark.parametrize("level", [1, 9])
+def test_compression_level(tmp_path, quoted_csv, level):
+    path = quoted_csv(rows=50)
+    record = batchprocessor.convert_file(str(path), "xml", compression="xz", compression_level=level)
+    assert record.output == str(tmp_path / "quoted.xml.xz")
+    with open(record.output, 'rb') as f:
+        assert lzma.decompress(f.read()).startswith(b"<?xml")
+
+
+@pytest.mark.parametrize("compression, level, message", [
+    ("bz2", 0, "bz2 compression level must be between 1 and 9, not 0"),
+    ("gz", 10, "gz compression level must be between 0 and 9, not 10"),
+    ("zip", None, "Unsupported compression: zip"),
+])
+def test_compression_options_are_checked_before_converting(tmp_path, quoted_csv, compression, level, message):
+    quoted_csv(rows=5)
+    with pytest.raises(ValueError, match=message):
+        batchprocessor.batch_process(str(tmp_path), "json", compression=compression, compression_level=level)
+    assert sorted(os.listdir(tmp_path)) == ["quoted.csv"]
+
+# ------------------------------
+# Row Access
+# ------------------------------
+
+def test_read_rows_range(quoted_csv):
+    path = quoted_csv(rows=3000)
+    rows = _read_csv(path)
+    assert list(batchprocessor.read_rows(str(path), 2500, 2510)) == rows[2500:2510]
+    assert list(batchprocessor.read_rows(str(path), 2999)) == rows[2999:]
+    assert list(batchprocessor.read_rows(str(path), 5000)) == []
+
+
+@pytest.mark.parametrize("output_format", ["json", "xml"])
+def test_read_rows_of_other_formats(tmp_path, output_format):
+    rows = [["id", "name"]] + [[str(i), f"n{i}, \"q\""] for i in range(30)]
+    path = tmp_path / "rows.csv"
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerows(rows)
+    record = batchprocessor.convert_file(str(path), output_format)
+    assert list(batchprocessor.read_rows(record.output, 10, 15)) == rows[10:15]
+
+
+def test_convert_rows_keeps_the_typed_header(tmp_path):
+    path = tmp_path / "typed.csv"
+    path.write_text("id,name\n" + "".join(f"{i},n{i}\n" for i in range(100)), encoding="utf-8")
+    output = tmp_path / "range.json"
+    batchprocessor.convert_rows(str(path), str(output), "json", 50, 53, compact=True, typed=True)
+    assert json.loads(output.read_text(encoding="utf-8")) == [["id", "name"], [49, "n49"], [50, "n50"], [51, "n51"]]
+
+# ------------------------------
+# JSON Lines
+# ------------------------------
+
+def test_ndjson_round_trip(tmp_path, quoted_csv):
+    path = quoted_csv(rows=50)
+    record = batchprocessor.convert_file(str(path), "ndjson")
+    lines = (tmp_path / "quoted.ndjson").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line) for line in lines] == _read_csv(path)
+    back = batchprocessor.convert_file(record.output, "csv", output_dir=str(tmp_path / "back"))
+    assert (tmp_path / "back" / "quoted.csv").read_bytes() == path.read_bytes() and back.ok
+
+
+def test_parallel_ndjson_matches_serial(tmp_path, quoted_csv):
+    path = quoted_csv()
+    ndjson = batchprocessor.convert_file(str(path), "ndjson").output
+    for source, output_format in ((path, "ndjson"), (ndjson, "csv"), (ndjson, "json")):
+        serial = batchprocessor.convert_file(str(source), output_format, output_dir=str(tmp_path / "serial"))
+        parallel = tmp_path / f"parallel.{output_format}"
+        batchprocessor.parallel_conversion(str(source), str(parallel), output_format, chunk_size=64, max_workers=2)
+        with open(serial.output, 'rb') as f:
+            assert parallel.read_bytes() == f.read()
+
+
+def test_parallel_ndjson_errors_count_lines_from_the_top(tmp_path):
+    path = tmp_path / "rows.ndjson"
+    path.write_text("".join(f"[{i}, \"x\"]\n" for i in range(50)) + '{"a": 1}\n', encoding="utf-8")
+    with pytest.raises(ValueError, match="line 51"):
+        batchprocessor.parallel_conversion(str(path), str(tmp_path / "rows.csv"), "csv", chunk_size=64,
+                                           max_workers=2)
+
+
+@pytest.mark.parametrize("output_format", ["csv", "xml"])
+@pytest.mark.parametrize("text, message", [
+    ('[1, 2]\n\n{"a": 1, "b": 2}\n', "line 3: expected an array of cells, found an object"),
+    ('"hello"\n', "line 1: expected an array of cells, found a string"),
+])
+def test_ndjson_rows_must_be_arrays(output_format, text, message):
+    with pytest.raises(ValueError, match=message):
+        batchprocessor.convert_stream(io.StringIO(text), io.StringIO(), "ndjson", output_format)
+
+
+@pytest.mark.parametrize("output_format", ["csv", "xml"])
+def test_json_array_rows_must_be_arrays(output_format):
+    with pytest.raises(ValueError, match="index 1: expected an array of cells, found an object"):
+        batchprocessor.convert_stream(io.StringIO('[["a"], {"a": 1}]'), io.StringIO(), "json", output_format)
+
+
+def test_ndjson_objects_convert_to_json():
+    output = io.StringIO()
+    batchprocessor.convert_stream(io.StringIO('{"a": 1}\n"hello"\n'), output, "ndjson", "json", compact=True)
+    assert json.loads(output.getvalue()) == [{"a": 1}, "hello"]
+
+# ------------------------------
+# Memory Budget
+# ------------------------------
+
+def test_memory_budget_admission():
+    budget = batchprocessor._MemoryBudget(100)
+    assert budget.fits(500)  # bigger than the whole limit, but nothing else is running
+    budget.reserve(60)
+    assert budget.fits(40) and not budget.fits(41)
+    budget.reserve(40)
+    budget.release(60)
+    assert budget.fits(60) and not budget.fits(61)
+    assert batchprocessor._MemoryBudget(None).fits(1 << 60)
+
+
+def test_estimate_memory(tmp_path, quoted_csv):
+    path = quoted_csv(rows=100)
+    size = path.stat().st_size
+    streaming = batchprocessor.estimate_memory(str(path), "json")
+    assert batchprocessor.estimate_memory(str(path), "xml") == streaming
+    assert batchprocessor.estimate_memory(str(path), "json", typed=True) > streaming + size
+    nested = tmp_path / "nested.json"
+    nested.write_text(json.dumps({"tag": "a", "attributes": {}, "text": "x" * size, "children": []}),
+                      encoding="utf-8")
+    array = tmp_path / "array.json"
+    array.write_text(json.dumps([["x" * size]]), encoding="utf-8")
+    assert batchprocessor.estimate_memory(str(nested), "xml") > streaming + size
+    assert batchprocessor.estimate_memory(str(array), "xml") == streaming
+
+
+@pytest.mark.parametrize("memory_budget, most_at_once", [(1, 1), (None, 4)])
+def test_memory_budget_limits_concurrent_conversions(tmp_path, quoted_csv, monkeypatch, memory_budget,
+                                                     most_at_once):
+    for i in range(8):
+        quoted_csv(rows=10, name=f"part{i}.csv")
+    running = []
+    most = []
+    lock = threading.Lock()
+    convert_file = batchprocessor.convert_file
+
+    def slow_convert_file(*args, **kwargs):
+        with lock:
+            running.append(1)
+            most.append(len(running))
+        time.sleep(0.05)
+        try:
+            return convert_file(*args, **kwargs)
+        finally:
+            with lock:
+                running.pop()
+
+    monkeypatch.setattr(batchprocessor, "convert_file", slow_convert_file)
+    results = batchprocessor.batch_process(str(tmp_path), "json", max_workers=4, memory_budget=memory_budget)
+    assert results.converted == 8
+    assert max(most) == most_at_once
@@ -0,0 +1,75 @@
+import os
+import sys
+import json
+import subprocess
+
+import pytest
+
+import cli
+
+_REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run(*args, stdin=b""):
+    return subprocess.run([sys.executable, "-m", "batchprocessor", *args], input=stdin, capture_output=True,
+                          cwd=_REPOSITORY, timeout=60)
+
+
+def test_converts_files_and_prints_their_outputs(tmp_path, quoted_csv, capsys):
+    path = quoted_csv(rows=10)
+    assert cli.main([str(path), "--to", "json", "--to", "xml"]) == 0
+    assert capsys.readouterr().out.splitlines() == [str(tmp_path / "quoted.json"), str(tmp_path / "quoted.xml")]
+
+
+def test_converts_stdin_to_stdout():
+    result = _run("-", "--from", "csv", "--to", "json", "--compact", stdin=b'a,b\r\n"c\nd",e\r\n')
+    assert result.returncode == 0 and result.stderr == b""
+    assert result.stdout == b'[["a","b"],["c\\nd","e"]]'
+
+
+def test_stdin_errors_are_reported():
+    result = _run("-", "--from", "json", "--to", "csv", stdin=b'[{"a": 1}]')
+    assert result.returncode == 1
+    assert b"-: Error converting JSON to CSV" in result.stderr
+
+
+def test_failed_files_set_the_exit_status(tmp_path, capsys):
+    path = tmp_path / "broken.json"
+    path.write_text("[1, 2", encoding="utf-8")
+    assert cli.main([str(path), "--to", "csv"]) == 1
+    assert str(path) in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("args", [["-", "--to", "csv"], ["-", "--from", "csv", "--to", "json", "--to", "xml"]])
+def test_stdin_needs_one_input_and_output_format(args):
+    with pytest.raises(SystemExit) as exit_info:
+        cli.main(args)
+    assert exit_info.value.code == 2
+
+
+def test_starts_without_tkinter():
+    result = subprocess.run([sys.executable, "-c", "import sys, cli; print('tkinter' in sys.modules)"],
+                            capture_output=True, cwd=_REPOSITORY, timeout=60)
+    assert result.stdout.strip() == b"False"
+
+
+def test_metrics_file_has_a_line_per_file_and_a_folder_summary(tmp_path, quoted_csv):
+    quoted_csv(rows=10, name="a.csv")
+    quoted_csv(rows=20, name="b.csv")
+    metrics = tmp_path / "metrics.jsonl"
+    assert cli.main([str(tmp_path), "--to", "ndjson", "--metrics", str(metrics)]) == 0
+    lines = [json.loads(line) for line in metrics.read_text(encoding="utf-8").splitlines()]
+    assert sorted(line["input_file"] for line in lines[:-1]) == [str(tmp_path / "a.csv"), str(tmp_path / "b.csv")]
+    assert all(line["error"] is None and line["rows"] for line in lines[:-1])
+    assert lines[-1]["folder"] == str(tmp_path) and lines[-1]["summary"]["converted"] == 2
+
+
+@pytest.mark.parametrize("size, ok", [("512", True), ("1K", True), ("1.5 GB", True), ("lots", False)])
+def test_memory_budget_sizes(tmp_path, quoted_csv, size, ok):
+    quoted_csv(rows=10)
+    if ok:
+        assert cli.main([str(tmp_path), "--to", "json", "--memory-budget", size]) == 0
+        assert (tmp_path / "quoted.json").exists()
+    else:
+        with pytest.raises(SystemExit):
+            cli.main([str(tmp_path), "--to", "json", "--memory-budget", size])
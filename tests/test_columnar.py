@@ -0,0 +1,41 @@
+import pytest
+
+from columnar import Column, ColumnarTable
+
+
+@pytest.mark.parametrize("texts, kind", [
+    (["", ""], "null"),
+    (["1", "", "-20"], "int"),
+    (["1", "2.5", "1e3"], "float"),
+    (["1", "2.5", "x"], "string"),
+    (["9223372036854775808"], "float"),
+    (["1_000"], "string"),
+    ([" 7"], "string"),
+    (["0x1F"], "string"),
+    (["nan"], "string"),
+    (["inf"], "string"),
+    (["01"], "string"),
+])
+def test_column_types(texts, kind):
+    column = Column()
+    for text in texts:
+        column.append(text)
+    assert column.kind == kind
+
+
+def test_typed_rows():
+    table = ColumnarTable.from_rows([["id", "price", "note"], ["1", "2011.10", "a"], ["2", "", "3"],
+                                     ["9007199254740993", "4", ""]])
+    assert table.column_types == ["int", "float", "string"]
+    assert list(table.iterrows()) == [["id", "price", "note"], [1, 2011.1, "a"], [2, None, "3"],
+                                      [9007199254740993, 4, ""]]
+
+
+@pytest.mark.parametrize("rows", [
+    [["h"], ["2011.10"], ["1e3"], ["x"]],
+    [["h"], ["9007199254740993"], ["0.5"]],
+    [["a", "b"], ["1"], ["2", "3", "4"], []],
+    [["h"], [""], ["-0.0"], ["5"]],
+])
+def test_untyped_rows_round_trip(rows):
+    assert list(ColumnarTable.from_rows(rows).iterrows(typed=False)) == rows
@@ -0,0 +1,45 @@
+import csv
+
+from rowindex import CsvRowIndex, csv_row_index
+
+
+def _read_csv(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.reader(f))
+
+
+def test_seek(quoted_csv):
+    path = quoted_csv(rows=100)
+    rows = _read_csv(path)
+    index = CsvRowIndex.build(str(path), stride=8)
+    assert index.rows == len(rows)
+    for row in (0, 1, 7, 8, 9, 63, 64, len(rows) - 1):
+        offset, skip = index.seek(row)
+        with open(path, newline='', encoding='utf-8') as f:
+            f.seek(offset)
+            reader = csv.reader(f)
+            for _ in range(skip):
+                next(reader)
+            assert next(reader) == rows[row]
+    assert index.seek(len(rows)) == (path.stat().st_size, 0)
+
+
+def test_save_and_load(quoted_csv):
+    path = quoted_csv(rows=40)
+    index = CsvRowIndex.build(str(path), stride=4)
+    index.save()
+    loaded = CsvRowIndex.load(str(path))
+    assert list(loaded.offsets) == list(index.offsets) and loaded.rows == index.rows
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write("more,rows,here\n")
+    assert CsvRowIndex.load(str(path)) is None
+    assert csv_row_index(str(path)).rows == index.rows + 1
+
+
+def test_empty_and_unterminated_files(tmp_path):
+    empty = tmp_path / "empty.csv"
+    empty.write_bytes(b"")
+    assert CsvRowIndex.build(str(empty)).rows == 0
+    unterminated = tmp_path / "unterminated.csv"
+    unterminated.write_bytes(b'a,b\r\n"c\nd",e')
+    assert CsvRowIndex.build(str(unterminated), stride=1).rows == 2
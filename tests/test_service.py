@@ -0,0 +1,110 @@
+import json
+import socket
+import asyncio
+import threading
+import http.client
+
+import pytest
+
+import service
+
+
+@pytest.fixture
+def server():
+    """A ConversionService on a free port, run on its own event loop thread"""
+    conversion_service = service.ConversionService(port=0, max_concurrent=2, max_body=1 << 20)
+    loop = asyncio.new_event_loop()
+    started = threading.Event()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(conversion_service.start())
+        started.set()
+        loop.run_forever()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    assert started.wait(10)
+    yield conversion_service
+
+    async def stop():
+        conversion_service._server.close()
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run_coroutine_threadsafe(stop(), loop).result(10)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(10)
+    loop.close()
+    conversion_service._executor.shutdown(wait=True)
+
+
+def _post(server, query, body, headers=None):
+    connection = http.client.HTTPConnection("127.0.0.1", server.port, timeout=30)
+    try:
+        connection.request("POST", f"/convert?{query}", body, headers or {})
+        response = connection.getresponse()
+        return response.status, response.getheader("Content-Type"), response.read()
+    finally:
+        connection.close()
+
+
+_CSV = 'name,note\r\nann,"multi\nline"\r\n"b, c",x\r\n'
+
+
+def test_round_trip(server):
+    status, content_type, body = _post(server, "from=csv&to=json&compact=1", _CSV.encode("utf-8"))
+    assert status == 200 and content_type == "application/json"
+    assert json.loads(body) == [["name", "note"], ["ann", "multi\nline"], ["b, c", "x"]]
+
+    status, content_type, back = _post(server, "to=csv", body, {"Content-Type": "application/json"})
+    assert status == 200 and content_type.startswith("text/csv")
+    assert back.decode("utf-8") == _CSV
+
+
+def test_streams_large_bodies(server):
+    rows = "".join(f"{i},value {i}\n" for i in range(20000)).encode("utf-8")
+    status, _, body = _post(server, "from=csv&to=ndjson", rows)
+    assert status == 200
+    lines = body.decode("utf-8").splitlines()
+    assert len(lines) == 20000 and json.loads(lines[-1]) == ["19999", "value 19999"]
+
+
+@pytest.mark.parametrize("query, body, status", [
+    ("from=json&to=csv", b'[{"a": 1}]', 400),
+    ("from=yaml&to=csv", b"a", 400),
+])
+def test_errors(server, query, body, status):
+    assert _post(server, query, body)[0] == status
+
+
+def test_body_over_the_limit(server):
+    # Refused from the Content-Length alone, before any of the body is sent
+    with socket.create_connection(("127.0.0.1", server.port), timeout=30) as sock:
+        sock.sendall(b"POST /convert?from=csv&to=json HTTP/1.1\r\nContent-Length: %d\r\n\r\n" % ((1 << 20) + 1))
+        assert sock.recv(64).startswith(b"HTTP/1.1 413 ")
+
+
+def test_chunked_body_over_the_limit(server):
+    # Refused as soon as the size line of a chunk that would pass the limit arrives
+    with socket.create_connection(("127.0.0.1", server.port), timeout=30) as sock:
+        sock.sendall(b"POST /convert?from=csv&to=json HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n"
+                     b"4\r\na,b\n\r\n%x\r\n" % (1 << 20))
+        assert sock.recv(64).startswith(b"HTTP/1.1 413 ")
+
+
+def test_unread_output_stops_the_conversion(server, monkeypatch):
+    monkeypatch.setattr(service, "_MAX_UNDRAINED", 256 << 10)
+    server.max_body = None
+    piece = b"x,y,z\n" * 10000
+    pieces = 1000
+    with socket.create_connection(("127.0.0.1", server.port), timeout=30) as sock:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        sock.sendall(b"POST /convert?from=csv&to=json HTTP/1.1\r\nContent-Length: %d\r\n\r\n"
+                     % (len(piece) * pieces))
+        # The body is never finished: the connection is reset once the unread output passes the mark
+        with pytest.raises(ConnectionError):
+            for _ in range(pieces):
+                sock.sendall(piece)
@@ -0,0 +1,62 @@
+import os
+import json
+import time
+
+from watch import FolderWatcher
+
+
+def _poll_until(watcher, count, timeout=30):
+    records = []
+    deadline = time.monotonic() + timeout
+    while len(records) < count:
+        assert time.monotonic() < deadline, records
+        records += watcher.poll()
+        time.sleep(0.01)
+    return records
+
+
+def _settle(path, age=3600):
+    """Backdate a file so it counts as settled however long the watcher waits"""
+    mtime_ns = time.time_ns() - age * 10 ** 9
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_files_convert_once_they_settle(tmp_path):
+    path = tmp_path / "a.csv"
+    path.write_text("x\n1\n", encoding="utf-8")
+    with FolderWatcher(str(tmp_path), "json", interval=0, settle=600) as watcher:
+        for _ in range(3):
+            assert watcher.poll() == []
+            time.sleep(0.01)
+        _settle(path)
+        records = _poll_until(watcher, 1)
+    assert [record.output for record in records] == [str(tmp_path / "a.json")]
+    assert json.loads((tmp_path / "a.json").read_text(encoding="utf-8")) == [["x"], ["1"]]
+
+
+def test_changed_files_are_converted_again(tmp_path):
+    path = tmp_path / "a.csv"
+    path.write_text("x\n1\n", encoding="utf-8")
+    _settle(path)
+    with FolderWatcher(str(tmp_path), "json", interval=0, settle=600) as watcher:
+        _poll_until(watcher, 1)
+        for _ in range(3):
+            assert watcher.poll() == []  # neither a.csv again nor its own output, a.json
+            time.sleep(0.01)
+        path.write_text("x\n2\n", encoding="utf-8")
+        _settle(path, age=1800)
+        records = _poll_until(watcher, 1)
+    assert records[0].ok and not records[0].skipped
+    assert json.loads((tmp_path / "a.json").read_text(encoding="utf-8")) == [["x"], ["2"]]
+
+
+def test_restarted_watcher_skips_converted_files(tmp_path):
+    path = tmp_path / "a.csv"
+    path.write_text("x\n1\n", encoding="utf-8")
+    _settle(path)
+    with FolderWatcher(str(tmp_path), "json", manifest=True, interval=0) as watcher:
+        first = _poll_until(watcher, 1)
+    with FolderWatcher(str(tmp_path), "json", manifest=True, interval=0) as watcher:
+        second = _poll_until(watcher, 1)
+    assert not first[0].skipped and second[0].skipped
+    assert second[0].output == first[0].output
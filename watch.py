@@ -0,0 +1,238 @@
+import os
+import time
+import threading
+import collections
+from batchprocessor import (
+    ConversionManifest, ConversionResult, estimate_memory, make_executor, split_format,
+    _CANCEL_POLL, _COMPRESSIONS, _FORMATS, _MemoryBudget, _check_compression, _in_flight_limit,
+    _manifest_path, _manifest_target, _mirrored_dir, _output_compression, _output_formats, _output_key,
+    _output_path, _remove_partial_outputs, _submit_conversion, _walk_inputs,
+)
+
+
+# Seconds between scans of a watched folder
+DEFAULT_INTERVAL = 1.0
+
+# A file is converted once its size and mtime have held still this many seconds
+DEFAULT_SETTLE = 2.0
+
+
+class FolderWatcher:
+    """Convert files as they land in a drop folder, on one long-lived executor"""
+
+    def __init__(self, folder_path, output_format, compact=False, backend="thread", max_workers=None,
+                 manifest=None, typed=False, on_result=None, recursive=False, include=None, exclude=None,
+                 output_dir=None, compression=None, compression_level=None, interval=DEFAULT_INTERVAL,
+                 settle=DEFAULT_SETTLE, memory_budget=None):
+        if not os.path.isdir(folder_path):
+            raise ValueError(f"Not a folder: {folder_path}")
+        _check_compression(compression, compression_level)
+        self.folder_path = folder_path
+        self.output_format = output_format
+        self.compact = compact
+        self.typed = typed
+        self.on_result = on_result
+        self.recursive = recursive
+        self.include = include
+        self.exclude = exclude
+        self.output_dir = output_dir
+        self.compression = compression
+        self.compression_level = compression_level
+        self.interval = interval
+        self.settle = settle
+        self._formats = _output_formats(output_format)
+        self._ignore = () if output_dir is None else (output_dir,)
+
+        self._seen = {}      # path -> ((size, mtime_ns), when it was first seen that way)
+        self._done = {}      # path -> (size, mtime_ns) it was last converted, skipped or failed at
+        self._futures = {}   # future -> (path, (size, mtime_ns), executor, estimated memory)
+        self._running = set()
+        self._claimed = {}   # output key -> the input that writes those outputs
+        self._outputs = set()
+        self._backlog = collections.deque()
+        self._next_scan = 0.0
+        self._memory = _MemoryBudget(memory_budget)
+
+        self._manifest = None
+        if manifest:
+            manifest_path = _manifest_path(folder_path, manifest)
+            self._manifest = ConversionManifest(manifest_path)
+            self._target = _manifest_target(output_format, compact, typed, output_dir, compression,
+                                            compression_level)
+            self._outputs.add(os.path.abspath(manifest_path))
+            self._outputs.update(os.path.abspath(output) for output in self._manifest.outputs())
+        self._backend = backend
+        self._max_workers = max_workers
+        self._in_flight = _in_flight_limit(backend, max_workers)
+        self._executor = make_executor(backend, max_workers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def poll(self):
+        """Collect finished conversions, scan the folder if a scan is due and submit settled files"""
+        records = self._harvest()
+        if time.monotonic() >= self._next_scan:
+            self._scan()
+            self._next_scan = time.monotonic() + self.interval
+        records += self._submit()
+        self._report(records)
+        return records
+
+    def run(self, stop=None):
+        """Poll until stop (a threading.Event) is set, then close the watcher"""
+        from concurrent.futures import wait, FIRST_COMPLETED
+
+        if stop is None:
+            stop = threading.Event()
+        try:
+            while not stop.is_set():
+                self.poll()
+                timeout = max(self._next_scan - time.monotonic(), 0.0)
+                if self._futures:
+                    wait(self._futures, timeout=min(timeout, _CANCEL_POLL), return_when=FIRST_COMPLETED)
+                else:
+                    stop.wait(timeout)
+        finally:
+            self.close()
+
+    def close(self):
+        """Drop queued files, let running conversions finish and shut the executor down"""
+        if self._executor is None:
+            return
+        self._backlog.clear()
+        for future in self._futures:
+            future.cancel()
+        self._executor.shutdown(wait=True)
+        self._executor = None
+        self._report(self._harvest())
+        if self._manifest is not None:
+            self._manifest.save()
+
+    def _scan(self):
+        """Diff the folder against the previous scan and queue the files that have settled"""
+        now = time.monotonic()
+        settle_ns = self.settle * 1e9
+        wall_ns = time.time_ns()
+        seen = {}
+        settled = []
+        for path, stat in _walk_inputs(self.folder_path, self.recursive, self.include, self.exclude, self._ignore):
+            signature = (stat.st_size, stat.st_mtime_ns)
+            previous = self._seen.get(path)
+            since = previous[1] if previous is not None and previous[0] == signature else now
+            seen[path] = (signature, since)
+            if (self._done.get(path) != signature and path not in self._running
+                    and (wall_ns - stat.st_mtime_ns >= settle_ns or now - since >= self.settle)):
+                settled.append((stat.st_mtime_ns, path))
+
+        for path in self._seen.keys() - seen.keys():
+            self._done.pop(path, None)
+            for key in [key for key, owner in self._claimed.items() if owner == path]:
+                del self._claimed[key]
+        self._seen = seen
+        settled.sort()
+        self._backlog = collections.deque(path for _, path in settled if not self._is_output(path))
+
+    def _is_output(self, path):
+        """Whether path is written by the watcher itself, or by a sibling input in another format"""
+        if os.path.abspath(path) in self._outputs:
+            return True
+        if self.output_dir is not None:
+            return False
+        base, file_format, file_compression = split_format(path)
+        if file_format not in self._formats:
+            return False
+        for fmt in _FORMATS:
+            for compression in (None, *_COMPRESSIONS):
+                sibling = _output_path(base, fmt, compression)
+                if (sibling != path and sibling in self._seen
+                        and _output_compression(sibling, self.compression) == file_compression):
+                    return True
+        return False
+
+    def _submit(self):
+        """Submit queued files while there is room; returns the files skipped or refused"""
+        records = []
+        deferred = []
+        while self._backlog and len(self._futures) < self._in_flight:
+            path = self._backlog.popleft()
+            if path in self._running or path not in self._seen:
+                continue
+            signature = self._seen[path][0]
+            output_dir = _mirrored_dir(path, self.folder_path, self.output_dir)
+            try:
+                key = _output_key(path, output_dir, self.compression, self.compression_level)
+            except ValueError as e:
+                self._done[path] = signature
+                records.append(ConversionResult(path, self.output_format, error=str(e)))
+                continue
+            owner = self._claimed.setdefault(key, path)
+            if owner != path:
+                self._done[path] = signature
+                records.append(ConversionResult(path, self.output_format,
+                                                error=f"Outputs would overwrite those of {owner}"))
+                continue
+            if self._manifest is not None:
+                output_file = self._manifest.current_output(path, self._target, output_dir)
+                if output_file is not None:
+                    self._done[path] = signature
+                    records.append(ConversionResult(path, self.output_format, output_file, skipped=True))
+                    continue
+            estimate = 0
+            if self._memory.limit is not None:
+                estimate = estimate_memory(path, self._formats, self.typed, signature[0])
+                if not self._memory.fits(estimate):
+                    deferred.append(path)
+                    continue
+
+            stem = os.path.join(output_dir or os.path.dirname(path), os.path.basename(split_format(path)[0]))
+            self._outputs.update(os.path.abspath(_output_path(stem, fmt, key[1])) for fmt in self._formats)
+            self._outputs.discard(os.path.abspath(path))
+            future = _submit_conversion(self._executor, path, self.output_format, self.compact, self.typed,
+                                        output_dir, self.compression, self.compression_level,
+                                        fingerprint=self._manifest is not None)
+            self._futures[future] = (path, signature, self._executor, estimate)
+            self._running.add(path)
+            self._memory.reserve(estimate)
+        self._backlog.extendleft(reversed(deferred))
+        return records
+
+    def _harvest(self):
+        """Collect the conversions that have finished, recording them in the manifest"""
+        from concurrent.futures import BrokenExecutor
+
+        records = []
+        for future in [future for future in self._futures if future.done()]:
+            path, signature, executor, estimate = self._futures.pop(future)
+            self._running.discard(path)
+            self._memory.release(estimate)
+            if future.cancelled():
+                continue
+            try:
+                record = future.result()
+            except BrokenExecutor as e:
+                # A worker process died (killed or out of memory); start a fresh pool for later files
+                record = ConversionResult(path, self.output_format, error=str(e) or type(e).__name__)
+                _remove_partial_outputs(path, self._formats, _mirrored_dir(path, self.folder_path, self.output_dir),
+                                        self.compression, self.compression_level)
+                if executor is self._executor:
+                    executor.shutdown(wait=False)
+                    self._executor = make_executor(self._backend, self._max_workers)
+            else:
+                if self._manifest is not None:
+                    record, fingerprint = record
+                    if record.ok:
+                        self._manifest.record(path, fingerprint, self._target, record.output)
+            self._done[path] = signature
+            records.append(record)
+        if records and self._manifest is not None:
+            self._manifest.save()
+        return records
+
+    def _report(self, records):
+        if self.on_result is not None:
+            for record in records:
+                self.on_result(record)